@@ -0,0 +1,265 @@
+"""
+ISS Pass Predictor - prediction-accuracy backtesting.
+Measures how pass predictions degrade with TLE age. Every element set in a
+historical TLE archive for one object predicts the passes of a common window;
+the predictions are matched by culmination time against those of the newest
+element set, and the rise/set, culmination and max-altitude errors are
+reported against the age of the TLE at the time of each pass.
+
+Each epoch is predicted for all sites at once with the batched engine
+(predict_passes_for_sites), and epochs are spread over a process pool in
+chunks. Results are written as Parquet by default.
+
+Example:
+    python backtest.py iss_history.tle --lat 39.9612 --lon -82.9988 --days 3 -o errors.parquet
+    python backtest.py iss_history.tle.gz --sites sites.csv --max-age 30 --workers 8 \\
+        --summary summary.csv
+"""
+
+import argparse
+import gzip
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from data_export import EXPORT_FORMATS, write_table
+from instrumentation import finish_trace, span, start_trace
+from iss_predictor import get_timescale, normalize_sites, predict_passes_for_sites
+from tle_cache import tle_epoch
+from tle_catalog import TLECatalog
+
+DEFAULT_DAYS = 3.0
+DEFAULT_MAX_AGE_DAYS = 30.0
+# Passes at one site are at least an orbit (~90 min) apart, so a generous
+# tolerance cannot pair a pass with its neighbour
+DEFAULT_MATCH_TOLERANCE = timedelta(minutes=20)
+# Epochs per process-pool task
+DEFAULT_EPOCHS_PER_TASK = 16
+
+ERROR_COLUMNS = [
+    'epoch', 'tle_age_days', 'site_id', 'pass_id', 'max_alt_time', 'max_altitude', 'matched',
+    'rise_error_s', 'max_alt_time_error_s', 'set_error_s', 'max_altitude_error',
+]
+
+
+def _open_text(path):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def read_tle_archive(paths, norad_id=None):
+    """
+    Read the element sets of one object from historical TLE files.
+
+    Files may be 2- or 3-line TLE text, optionally gzip-compressed. Returns a
+    DataFrame with epoch (naive UTC), line1 and line2, one row per distinct
+    epoch (the last copy wins), oldest first. `norad_id` may be omitted when
+    the archive only holds one object.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    lines = []
+    for path in paths:
+        with _open_text(path) as f:
+            lines.extend(f.readlines())
+    catalog = TLECatalog.from_lines(lines)
+
+    if norad_id is None:
+        objects = np.unique(catalog.norad_ids)
+        if len(objects) != 1:
+            raise ValueError(f"Archive holds {len(objects)} objects; pass norad_id")
+        norad_id = int(objects[0])
+    keep = np.flatnonzero(catalog.norad_ids == int(norad_id))
+    if not len(keep):
+        raise ValueError(f"No element sets for NORAD {norad_id} in the archive")
+
+    line1s = [catalog.line1s[i] for i in keep]
+    archive = pd.DataFrame({
+        'epoch': pd.to_datetime([tle_epoch(line).replace(tzinfo=None) for line in line1s]),
+        'line1': line1s,
+        'line2': [catalog.line2s[i] for i in keep],
+    })
+    archive = archive.drop_duplicates('epoch', keep='last')
+    return archive.sort_values('epoch', kind='stable').reset_index(drop=True)
+
+
+def _predict(line1, line2, sites, start_jd, days, min_altitude):
+    from skyfield.api import EarthSatellite
+
+    ts = get_timescale()
+    satellite = EarthSatellite(line1, line2, None, ts)
+    return predict_passes_for_sites(satellite, sites, ts.tt_jd(start_jd), days=days, min_altitude=min_altitude)
+
+
+def compare_passes(predicted, reference, tolerance=DEFAULT_MATCH_TOLERANCE):
+    """
+    Match `predicted` to `reference` passes by culmination time, per site.
+
+    Returns one row per reference pass (site_id, pass_id, max_alt_time,
+    max_altitude, matched) with the predicted-minus-reference errors of rise,
+    culmination and set time in seconds and of max altitude in degrees. The
+    errors are NaN where no predicted pass culminates within `tolerance`.
+    """
+    reference = reference[['site_id', 'pass_id', 'rise_time', 'max_alt_time', 'set_time', 'max_altitude']]
+    predicted = predicted[['site_id', 'rise_time', 'max_alt_time', 'set_time', 'max_altitude']].rename(
+        columns=lambda column: column if column == 'site_id' else f"{column}_pred")
+    predicted = predicted.assign(max_alt_time=predicted['max_alt_time_pred'])
+    # merge_asof needs both sides sorted on the key and the same dtype for the site column
+    # (an empty prediction table has object columns)
+    reference = reference.sort_values('max_alt_time', kind='stable')
+    predicted = predicted.astype({'site_id': reference['site_id'].dtype,
+                                  'max_alt_time': reference['max_alt_time'].dtype})
+    predicted = predicted.sort_values('max_alt_time', kind='stable')
+    matched = pd.merge_asof(reference, predicted, on='max_alt_time', by='site_id',
+                            direction='nearest', tolerance=pd.Timedelta(tolerance))
+
+    errors = pd.DataFrame({
+        'site_id': matched['site_id'],
+        'pass_id': matched['pass_id'],
+        'max_alt_time': matched['max_alt_time'],
+        'max_altitude': matched['max_altitude'],
+        'matched': matched['max_alt_time_pred'].notna(),
+    })
+    for column, error in (('rise_time', 'rise_error_s'), ('max_alt_time', 'max_alt_time_error_s'),
+                          ('set_time', 'set_error_s')):
+        errors[error] = (matched[f"{column}_pred"] - matched[column]).dt.total_seconds()
+    errors['max_altitude_error'] = matched['max_altitude_pred'] - matched['max_altitude']
+    return errors.sort_values(['site_id', 'pass_id'], kind='stable').reset_index(drop=True)
+
+
+def _backtest_epochs(task):
+    """Process-pool worker: predict and compare a chunk of epochs."""
+    epochs, sites, reference, start_jd, days, min_altitude, tolerance = task
+    margin = tolerance.total_seconds() / 86400.0
+    tables = []
+    for epoch, line1, line2 in epochs:
+        # Widened by the tolerance, so a pass shifted across the window edge still matches
+        predicted = _predict(line1, line2, sites, start_jd - margin, days + 2 * margin, min_altitude)
+        errors = compare_passes(predicted, reference, tolerance)
+        errors.insert(0, 'epoch', epoch)
+        tables.append(errors)
+    return tables
+
+
+def backtest(archive, sites, start=None, days=DEFAULT_DAYS, min_altitude=10.0, max_age_days=DEFAULT_MAX_AGE_DAYS,
+             tolerance=DEFAULT_MATCH_TOLERANCE, workers=1, epochs_per_task=DEFAULT_EPOCHS_PER_TASK):
+    """
+    Backtest every older epoch of `archive` against its newest one.
+
+    `archive` is a read_tle_archive() table. The passes of the window
+    [start, start + days) predicted from the newest element set are the
+    reference; `start` defaults to that set's epoch. Epochs more than
+    `max_age_days` older than `start` are skipped. Returns one row per
+    (epoch, reference pass) with the ERROR_COLUMNS; tle_age_days is the time
+    from the epoch to the reference culmination.
+    """
+    sites = normalize_sites(sites)
+    newest = archive.iloc[-1]
+    start = pd.Timestamp(start if start is not None else newest['epoch'])
+    ts = get_timescale()
+    start_jd = float(ts.from_datetime(start.to_pydatetime().replace(tzinfo=timezone.utc)).tt)
+
+    with span('backtest_reference'):
+        reference = _predict(newest['line1'], newest['line2'], sites, start_jd, days, min_altitude)
+    older = archive.iloc[:-1]
+    older = older[(older['epoch'] >= start - pd.Timedelta(days=max_age_days)) & (older['epoch'] <= start)]
+    epochs = list(older[['epoch', 'line1', 'line2']].itertuples(index=False, name=None))
+    if reference.empty or not epochs:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in zip(
+            ERROR_COLUMNS, ['datetime64[ns]', float, str, int, 'datetime64[ns]', float, bool] + [float] * 4)})
+
+    tasks = [(epochs[i:i + epochs_per_task], sites, reference, start_jd, days, min_altitude, tolerance)
+             for i in range(0, len(epochs), epochs_per_task)]
+    with span('backtest_epochs', epochs=len(epochs), sites=len(sites)):
+        if workers == 1 or len(tasks) == 1:
+            chunks = [_backtest_epochs(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = list(executor.map(_backtest_epochs, tasks))
+
+    errors = pd.concat([table for chunk in chunks for table in chunk], ignore_index=True)
+    errors.insert(1, 'tle_age_days', (errors['max_alt_time'] - errors['epoch']) / pd.Timedelta(days=1))
+    return errors[ERROR_COLUMNS]
+
+
+def summarize(errors, bin_days=1.0):
+    """
+    Error statistics per TLE-age bin.
+
+    Returns one row per bin of `bin_days` (labelled by its lower edge, in
+    days) with the number of reference passes, the share that was matched,
+    and the mean absolute / 95th-percentile absolute timing errors (seconds)
+    and max-altitude errors (degrees) of the matched passes.
+    """
+    age_bin = np.floor(errors['tle_age_days'] / bin_days) * bin_days
+    grouped = errors.assign(age_bin=age_bin).groupby('age_bin')
+    summary = pd.DataFrame({'passes': grouped.size(), 'match_rate': grouped['matched'].mean()})
+    for column in ('rise_error_s', 'set_error_s', 'max_alt_time_error_s', 'max_altitude_error'):
+        absolute = errors[column].abs().groupby(age_bin)
+        name = column.removesuffix('_error_s').removesuffix('_error')
+        summary[f"{name}_mae"] = absolute.mean()
+        summary[f"{name}_p95"] = absolute.quantile(0.95)
+    return summary.reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest pass predictions against a historical TLE archive.")
+    parser.add_argument('archive', nargs='+', help="TLE archive file(s), optionally .gz")
+    parser.add_argument('--norad', type=int, help="NORAD ID (needed when the archive holds several objects)")
+    location = parser.add_argument_group("location (one site, or --sites for many)")
+    location.add_argument('--lat', type=float, help="latitude in degrees north")
+    location.add_argument('--lon', type=float, help="longitude in degrees east (negative for west)")
+    location.add_argument('--elevation', type=float, default=0.0, help="elevation in metres")
+    location.add_argument('--sites', help="CSV with latitude, longitude[, elevation, site_id] columns")
+    parser.add_argument('--start', type=pd.Timestamp, help="UTC start of the window (default: newest epoch)")
+    parser.add_argument('--days', type=float, default=DEFAULT_DAYS, help=f"window length (default: {DEFAULT_DAYS:g})")
+    parser.add_argument('--min-altitude', type=float, default=10.0, help="rise/set altitude in degrees (default: 10)")
+    parser.add_argument('--max-age', type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help=f"skip epochs older than this many days (default: {DEFAULT_MAX_AGE_DAYS:g})")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_MATCH_TOLERANCE.total_seconds() / 60,
+                        help="culmination matching tolerance in minutes (default: 20)")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument('--output', '-o', default='backtest_errors.parquet', help="per-pass errors")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS),
+                        help="output format (default: from the --output extension, else csv)")
+    parser.add_argument('--summary', help="also write error statistics per age bin (format from the extension)")
+    parser.add_argument('--bin-days', type=float, default=1.0, help="age bin width for --summary (default: 1)")
+    parser.add_argument('--timings', action='store_true', help="print per-stage timings to stderr")
+    args = parser.parse_args(argv)
+
+    if args.sites:
+        from iss_pipeline import read_sites
+        sites = read_sites(args.sites)
+    elif args.lat is not None and args.lon is not None:
+        sites = [(args.lat, args.lon, args.elevation)]
+    else:
+        parser.error("give --lat and --lon, or --sites")
+
+    trace = start_trace('backtest')
+    with span('read_archive'):
+        archive = read_tle_archive(args.archive, args.norad)
+    errors = backtest(archive, sites, start=args.start, days=args.days, min_altitude=args.min_altitude,
+                      max_age_days=args.max_age, tolerance=timedelta(minutes=args.tolerance), workers=args.workers)
+    summary = summarize(errors, args.bin_days)
+    with span('export'):
+        write_table(errors, args.output, args.format)
+        if args.summary:
+            write_table(summary, args.summary)
+    finish_trace(trace)
+
+    print(f"{len(archive)} epochs, {errors['epoch'].nunique()} backtested, {len(errors)} pass comparisons",
+          file=sys.stderr)
+    print(summary.to_string(index=False, float_format=lambda value: f"{value:.2f}"), file=sys.stderr)
+    if args.timings:
+        for stage, seconds in trace.stage_totals().items():
+            print(f"{stage:<20} {seconds * 1000:10.1f} ms", file=sys.stderr)
+        print(f"{'total':<20} {trace.seconds * 1000:10.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
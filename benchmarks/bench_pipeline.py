@@ -0,0 +1,311 @@
+"""
+ISS Pass Predictor - prediction pipeline benchmarks.
+Times the pass search, TLE parsing and DataFrame build-up offline: TLEs are
+pinned (FALLBACK_TLE and synthetic variants of it), the start time is frozen
+and the ephemeris is read from a local directory. Results are written as JSON
+and compared against a stored baseline; a regression exits with status 1.
+
+Usage:
+    python benchmarks/bench_pipeline.py                      # run, compare with baseline.json
+    python benchmarks/bench_pipeline.py --quick              # smaller sweep, one repeat
+    python benchmarks/bench_pipeline.py --update-baseline    # record a new baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from iss_predictor import (add_visibility, find_pass_table, find_pass_tables,  # noqa: E402
+                           get_timescale, predict_passes_for_sites)
+from rolling_predictions import RollingPredictions  # noqa: E402
+from tle_cache import FALLBACK_TLE  # noqa: E402
+from tle_catalog import TLECatalog, tle_checksum  # noqa: E402
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, 'results.json')
+# Directory holding de421.bsp; visibility cases are skipped when it is missing
+DEFAULT_EPHEMERIS_DIR = os.environ.get('SKYFIELD_DATA', BENCHMARK_DIR)
+
+# Frozen start time, just after the FALLBACK_TLE epoch (2025 day 301)
+START = (2025, 10, 28, 12, 0, 0)
+# Default sidebar location (Columbus, OH)
+SITE = (39.9612, -82.9988, 275)
+
+# A case is a regression when it is this much slower (or bigger) than baseline
+DEFAULT_TIME_TOLERANCE = 0.5
+DEFAULT_MEMORY_TOLERANCE = 0.25
+# Differences smaller than this are timer noise, never regressions
+MIN_TIME_DELTA = 0.05
+MIN_MEMORY_DELTA_MIB = 0.5
+
+# Timing budget per case; the run count never exceeds MAX_RUNS
+MIN_CASE_SECONDS = 0.5
+MAX_RUNS = 50
+
+FULL_SWEEP = {
+    'days': [1, 3, 7, 14],
+    'min_altitude': [0.0, 10.0, 30.0],
+    'sites': [1, 10, 100],
+    'serial_sites': [1, 10],
+    'satellites': [1, 5, 20],
+    'catalog_records': [100, 1000],
+}
+QUICK_SWEEP = {
+    'days': [1, 7],
+    'min_altitude': [10.0],
+    'sites': [1, 10],
+    'serial_sites': [1],
+    'satellites': [1, 5],
+    'catalog_records': [100],
+}
+
+
+def _with_checksum(line):
+    return line[:68] + str(tle_checksum(line))
+
+
+def synthetic_tles(count):
+    """
+    `count` pinned TLE sets derived from FALLBACK_TLE.
+
+    Each copy gets its own NORAD ID and a shifted RAAN and mean anomaly, so the
+    orbits are ISS-like but the passes differ. Checksums are recomputed.
+    """
+    name, line1, line2 = FALLBACK_TLE
+    raan, mean_anomaly = float(line2[17:25]), float(line2[43:51])
+    records = []
+    for i in range(count):
+        norad = f"{90000 + i:05d}"
+        l1 = _with_checksum(f"1 {norad}{line1[7:]}")
+        l2 = (f"2 {norad}{line2[7:17]}{(raan + 37.0 * i) % 360:8.4f}{line2[25:43]}"
+              f"{(mean_anomaly + 53.0 * i) % 360:8.4f}{line2[51:]}")
+        records.append([f"{name} #{i}", l1, _with_checksum(l2)])
+    return records
+
+
+def synthetic_sites(count):
+    """`count` observer sites at seeded random positions, the same on every run."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'latitude': rng.uniform(-55.0, 55.0, count),
+        'longitude': rng.uniform(-180.0, 180.0, count),
+        'elevation': rng.uniform(0.0, 2000.0, count),
+    })
+
+
+class Context:
+    """Shared, pre-built inputs so cases time the pipeline and not the setup."""
+
+    def __init__(self, ephemeris_dir):
+        from skyfield.api import EarthSatellite, Loader, Topos
+
+        self.ts = get_timescale()
+        self.start = self.ts.utc(*START)
+        self.start_naive = datetime(*START)
+        self.observer = Topos(SITE[0], SITE[1], elevation_m=SITE[2])
+        self.tle = synthetic_tles(1)[0]
+        self.satellite = EarthSatellite(self.tle[1], self.tle[2], self.tle[0], self.ts)
+
+        self.eph = None
+        if os.path.exists(os.path.join(ephemeris_dir, 'de421.bsp')):
+            self.eph = Loader(ephemeris_dir, verbose=False)('de421.bsp')
+
+
+def _catalog_text(records):
+    return "\n".join(line for record in records for line in record)
+
+
+def build_cases(ctx, sweep):
+    """Return a list of (name, params, setup) where setup() returns a callable yielding a pass count."""
+    cases = []
+
+    for n in sweep['catalog_records']:
+        text = _catalog_text(synthetic_tles(n))
+        cases.append((f"tle_parse/records={n}", {'records': n},
+                      lambda text=text: lambda: len(TLECatalog.from_text(text))))
+
+    min_altitudes = sweep['min_altitude']
+    for days in sweep['days']:
+        for min_alt in (min_altitudes if days == 7 else [10.0]):
+            cases.append((f"single_site/days={days}/min_alt={min_alt:g}", {'days': days, 'min_altitude': min_alt},
+                          lambda days=days, min_alt=min_alt: lambda: len(find_pass_table(
+                              ctx.satellite, ctx.observer, ctx.start, days=days, min_altitude=min_alt))))
+
+    for n in sweep['sites']:
+        sites = synthetic_sites(n)
+        cases.append((f"sites_batched/sites={n}", {'sites': n, 'days': 7},
+                      lambda sites=sites: lambda: len(predict_passes_for_sites(
+                          ctx.satellite, sites, ctx.start, days=7))))
+
+    for n in sweep['serial_sites']:
+        def setup(n=n):
+            from skyfield.api import Topos
+            observers = [Topos(lat, lon, elevation_m=elev) for lat, lon, elev in synthetic_sites(n).to_numpy()]
+            return lambda: sum(len(find_pass_table(ctx.satellite, observer, ctx.start, days=7))
+                               for observer in observers)
+        cases.append((f"sites_serial/sites={n}", {'sites': n, 'days': 7}, setup))
+
+    for n in sweep['satellites']:
+        def setup(n=n):
+            catalog = TLECatalog.from_text(_catalog_text(synthetic_tles(n)))
+            satellites = catalog.satellites(catalog.norad_ids.tolist(), ctx.ts)
+            return lambda: len(find_pass_tables(satellites, ctx.observer, ctx.start, days=7))
+        cases.append((f"satellites/satellites={n}", {'satellites': n, 'days': 7}, setup))
+
+    # The sidebar handler: rolling refresh, then the datetime conversions
+    def setup_frame_build():
+        table = find_pass_table(ctx.satellite, ctx.observer, ctx.start, days=14)
+
+        def run():
+            passes = RollingPredictions().refresh(ctx.start_naive, None, lambda start, end: table, days=14)
+            for col in ['rise_time', 'max_alt_time', 'set_time']:
+                passes[col] = pd.to_datetime(passes[col])
+            return len(passes)
+        return run
+    cases.append(("frame_build/days=14", {'days': 14}, setup_frame_build))
+
+    if ctx.eph is not None:
+        def setup_visibility():
+            table = find_pass_table(ctx.satellite, ctx.observer, ctx.start, days=7, min_altitude=0.0)
+            return lambda: len(add_visibility(table, ctx.satellite, ctx.observer, ctx.eph, ts=ctx.ts,
+                                              drop_invisible=False))
+        cases.append(("visibility/days=7", {'days': 7}, setup_visibility))
+
+    return cases
+
+
+def run_case(setup, repeat):
+    """Best wall time over at least `repeat` runs, plus tracemalloc peak from one extra run."""
+    run = setup()
+    run()  # warm-up: imports, lazily built satellites, Skyfield caches
+
+    # Fast cases are repeated for at least MIN_CASE_SECONDS so the best time is stable
+    best, runs, elapsed = float('inf'), 0, 0.0
+    while runs < repeat or (elapsed < MIN_CASE_SECONDS and runs < MAX_RUNS):
+        started = time.perf_counter()
+        passes = run()
+        duration = time.perf_counter() - started
+        best, runs, elapsed = min(best, duration), runs + 1, elapsed + duration
+
+    # Measured separately, tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': round(best, 6),
+        'passes': int(passes),
+        'passes_per_second': round(passes / best, 1) if best > 0 else None,
+        'peak_mib': round(peak / 2 ** 20, 3),
+    }
+
+
+def compare(results, baseline, time_tolerance=DEFAULT_TIME_TOLERANCE,
+            memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """Return a list of human-readable regression messages (empty if none)."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if (current['seconds'] > reference['seconds'] * (1 + time_tolerance)
+                and current['seconds'] - reference['seconds'] > MIN_TIME_DELTA):
+            regressions.append(f"{name}: {current['seconds']:.3f}s vs baseline {reference['seconds']:.3f}s")
+        if (current['peak_mib'] > reference['peak_mib'] * (1 + memory_tolerance)
+                and current['peak_mib'] - reference['peak_mib'] > MIN_MEMORY_DELTA_MIB):
+            regressions.append(f"{name}: peak {current['peak_mib']:.1f} MiB vs baseline "
+                               f"{reference['peak_mib']:.1f} MiB")
+        if current['passes'] != reference['passes']:
+            regressions.append(f"{name}: {current['passes']} passes vs baseline {reference['passes']}")
+    return regressions
+
+
+def _environment():
+    import skyfield
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'skyfield': skyfield.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ISS pass prediction pipeline offline.")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--update-baseline', action='store_true', help="write the results to --baseline")
+    parser.add_argument('--ephemeris-dir', default=DEFAULT_EPHEMERIS_DIR,
+                        help="directory containing de421.bsp (never downloaded)")
+    parser.add_argument('--repeat', type=int, default=3, help="minimum timed runs per case (best is kept)")
+    parser.add_argument('--quick', action='store_true', help="smaller sweep with a single repeat")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--time-tolerance', type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    ctx = Context(args.ephemeris_dir)
+    if ctx.eph is None:
+        print(f"de421.bsp not found in {args.ephemeris_dir}; skipping visibility cases")
+    repeat = 1 if args.quick else args.repeat
+
+    results = {}
+    for name, params, setup in build_cases(ctx, QUICK_SWEEP if args.quick else FULL_SWEEP):
+        if args.filter not in name:
+            continue
+        results[name] = {'params': params, **run_case(setup, repeat)}
+        r = results[name]
+        print(f"{name:<40} {r['seconds']:9.4f}s {r['passes']:7d} passes "
+              f"{r['passes_per_second'] or 0:11.1f}/s {r['peak_mib']:9.2f} MiB")
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'start': datetime(*START).isoformat(),
+        'repeat': repeat,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSION")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print("No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+ISS Pass Predictor - import-time report.
+Measures, each in a fresh interpreter, how long the project modules and their
+heavy dependencies take to import (via `python -X importtime`), and optionally
+the Streamlit app's cold first run and rerun on the landing page.
+
+Usage:
+    python benchmarks/import_time.py                      # module table
+    python benchmarks/import_time.py --detail iss_pipeline # heaviest imports of one module
+    python benchmarks/import_time.py --app --json import_times.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROJECT_MODULES = [
+    'instrumentation', 'data_export', 'charts', 'tle_cache', 'tle_catalog', 'tle_fetcher', 'prediction_cache',
+    'rolling_predictions', 'observation_store', 'iss_predictor', 'iss_pipeline', 'backtest',
+]
+DEPENDENCIES = ['numpy', 'pandas', 'requests', 'skyfield.api', 'matplotlib.pyplot', 'pyarrow', 'streamlit']
+
+_APP_SCRIPT = """
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join(sys.argv[1], 'streamlit_app.py'), default_timeout=300)
+started = time.perf_counter(); at.run(); first = time.perf_counter() - started
+started = time.perf_counter(); at.run(); rerun = time.perf_counter() - started
+print(json.dumps({'first_run': first, 'rerun': rerun,
+                  'loaded': [m for m in ('skyfield', 'matplotlib') if m in sys.modules]}))
+"""
+
+
+def import_profile(module):
+    """
+    Import `module` in a fresh interpreter with -X importtime.
+
+    Returns {imported package: (self_us, cumulative_us, nested)} for every
+    import, where `nested` is False for imports made directly by the import
+    statement. Raises RuntimeError if the import failed.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented by two spaces per level
+        profile[name.strip()] = (int(self_us), int(cumulative_us), name.startswith('   '))
+    return profile
+
+
+def module_seconds(module):
+    """Cumulative import time of `module` in seconds (None if it cannot be imported)."""
+    try:
+        profile = import_profile(module)
+    except RuntimeError:
+        return None
+    # `import a.b` imports a, then a.b; each is recorded as a top-level import
+    parts = module.split('.')
+    names = ['.'.join(parts[:i + 1]) for i in range(len(parts))]
+    return sum(profile[name][1] for name in names if name in profile and not profile[name][2]) / 1e6
+
+
+def app_timings():
+    """Cold first run and rerun of the app's landing page, in a fresh interpreter."""
+    env = dict(os.environ, ISS_OBSERVATION_DB=':memory:')
+    result = subprocess.run([sys.executable, '-c', _APP_SCRIPT, ROOT], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import times of the project modules.")
+    parser.add_argument('--detail', metavar='MODULE', help="list the heaviest imports of one module")
+    parser.add_argument('--top', type=int, default=15, help="rows for --detail (default: 15)")
+    parser.add_argument('--app', action='store_true', help="also time the Streamlit app's first run and rerun")
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if args.detail:
+        profile = import_profile(args.detail)
+        print(f"{'module':<40} {'self ms':>9} {'cumul ms':>9}")
+        for name, (self_us, cumulative_us, _) in sorted(profile.items(), key=lambda item: -item[1][0])[:args.top]:
+            print(f"{name:<40} {self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}")
+        return 0
+
+    results = {'modules': {}, 'dependencies': {}}
+    for group, modules in (('modules', PROJECT_MODULES), ('dependencies', DEPENDENCIES)):
+        print(f"\n{group}")
+        for module in modules:
+            seconds = module_seconds(module)
+            results[group][module] = seconds
+            shown = "not importable" if seconds is None else f"{seconds * 1000:8.1f} ms"
+            print(f"  {module:<24} {shown}")
+
+    if args.app:
+        results['app'] = app_timings()
+        print(f"\nstreamlit_app.py  first run {results['app']['first_run'] * 1000:.0f} ms, "
+              f"rerun {results['app']['rerun'] * 1000:.0f} ms, "
+              f"loaded on landing page: {', '.join(results['app']['loaded']) or 'neither skyfield nor matplotlib'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
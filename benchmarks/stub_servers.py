@@ -0,0 +1,249 @@
+"""
+ISS Pass Predictor - TLE download checks against local stub servers.
+Serves GP queries and a stations file from a threaded local HTTP server that
+can delay, fail or omit responses, and checks that AsyncTLEFetcher hedges,
+retries and caps concurrency as documented, and that TLECache.refresh()
+revalidates with ETag / Last-Modified and keeps the entry on a 304. Runs
+offline in a few seconds; a failed check exits with status 1.
+
+Usage:
+    python benchmarks/stub_servers.py
+    python benchmarks/stub_servers.py --filter cache    # only checks whose name contains "cache"
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import synthetic_tles  # noqa: E402
+from tle_cache import TLECache  # noqa: E402
+from tle_fetcher import fetch_tle_sets  # noqa: E402
+
+# Objects on the stub's stations file and GP endpoint
+RECORDS = {int(record[1][2:7]): record for record in synthetic_tles(12)}
+MISSING_ID = 99999
+
+
+class StubServer:
+    """
+    Local Celestrak stand-in on a free port, serving /gp?CATNR=<id> and /stations.txt.
+
+    `gp_delay` / `stations_delay` hold responses back (seconds), `gp_status` /
+    `stations_status` replace them with that HTTP status, and `etag` /
+    `last_modified` are sent with GP responses; a GP request that presents
+    them gets a 304. Requests and the peak number in flight are counted.
+    """
+
+    def __init__(self, gp_delay=0.0, stations_delay=0.0, gp_status=200, stations_status=200,
+                 etag=None, last_modified=None):
+        self.gp_delay = gp_delay
+        self.stations_delay = stations_delay
+        self.gp_status = gp_status
+        self.stations_status = stations_status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def gp_url(self):
+        return self.base_url + "/gp?CATNR={norad_id}"
+
+    @property
+    def stations_url(self):
+        return self.base_url + "/stations.txt"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond(self, request):
+        url = urlparse(request.path)
+        if url.path == '/stations.txt':
+            time.sleep(self.stations_delay)
+            body = "\n".join(line for record in RECORDS.values() for line in record)
+            return self.stations_status, body, {}
+
+        time.sleep(self.gp_delay)
+        if self.gp_status != 200:
+            return self.gp_status, "", {}
+        validators = {'ETag': self.etag, 'Last-Modified': self.last_modified}
+        validators = {name: value for name, value in validators.items() if value}
+        if validators and (request.headers.get('If-None-Match') == self.etag
+                           or request.headers.get('If-Modified-Since') == self.last_modified):
+            return 304, "", validators
+        record = RECORDS.get(int(parse_qs(url.query)['CATNR'][0]))
+        # Celestrak answers unknown objects with 200 and a plain-text note
+        return 200, "\n".join(record) if record else "No GP data found", validators
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    status, body, headers = stub._respond(self)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                data = body.encode('utf-8')
+                try:
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    # The fetcher already returned and closed its connection
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _fetch(stub, norad_ids, **kwargs):
+    kwargs.setdefault('retry_delay', 0.05)
+    return fetch_tle_sets(norad_ids, gp_url=stub.gp_url, stations_url=stub.stations_url, timeout=5, **kwargs)
+
+
+def check_slow_primary():
+    """A primary slower than the secondary does not delay the result."""
+    norad_id = next(iter(RECORDS))
+    with StubServer(gp_delay=2.0) as stub:
+        result = _fetch(stub, [norad_id])[norad_id]
+    failures = []
+    if result is None or result.source != 'secondary':
+        failures.append(f"expected the secondary to win, got {result}")
+    elif result.seconds > 1.0:
+        failures.append(f"secondary result took {result.seconds:.2f} s")
+    elif result.lines != RECORDS[norad_id]:
+        failures.append("secondary returned the wrong TLE set")
+    return failures
+
+
+def check_failing_primary():
+    """A primary answering 503 is retried and the secondary's result is used."""
+    norad_id = next(iter(RECORDS))
+    warnings = []
+    with StubServer(gp_status=503, stations_delay=0.5) as stub:
+        result = _fetch(stub, [norad_id], primary_attempts=2,
+                        notify=lambda level, message: warnings.append(level))[norad_id]
+        gp_requests = sum(path.startswith('/gp') for path, _ in stub.requests)
+    failures = []
+    if result is None or result.source != 'secondary':
+        failures.append(f"expected the secondary to win, got {result}")
+    if gp_requests != 2:
+        failures.append(f"expected 2 primary attempts, saw {gp_requests}")
+    if warnings.count('warning') != 1:
+        failures.append(f"expected one retry warning, got {warnings}")
+    return failures
+
+
+def check_missing_object():
+    """An object neither source knows gives None, without retries."""
+    with StubServer() as stub:
+        result = _fetch(stub, [MISSING_ID])[MISSING_ID]
+        gp_requests = sum(path.startswith('/gp') for path, _ in stub.requests)
+    failures = []
+    if result is not None:
+        failures.append(f"expected None, got {result}")
+    if gp_requests != 1:
+        failures.append(f"expected a single primary request, saw {gp_requests}")
+    return failures
+
+
+def check_concurrency_cap():
+    """fetch_many() never has more than max_concurrency requests in flight."""
+    max_concurrency = 3
+    with StubServer(gp_delay=0.2, stations_status=404) as stub:
+        results = _fetch(stub, list(RECORDS), max_concurrency=max_concurrency, secondary_attempts=1)
+        peak = stub.max_in_flight
+    failures = []
+    missing = [norad_id for norad_id, result in results.items() if result is None or result.source != 'primary']
+    if missing:
+        failures.append(f"no primary result for {missing}")
+    if peak > max_concurrency:
+        failures.append(f"{peak} requests in flight, cap is {max_concurrency}")
+    if peak < 2:
+        failures.append(f"requests ran one at a time (peak {peak})")
+    return failures
+
+
+def check_cache_revalidation():
+    """TLECache.refresh() stores validators, sends them back and keeps the entry on a 304."""
+    norad_id = next(iter(RECORDS))
+    failures = []
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            StubServer(etag='"v1"', last_modified='Tue, 28 Oct 2025 03:00:00 GMT') as stub:
+        cache = TLECache(cache_dir=cache_dir, url_template=stub.gp_url, timeout=5)
+        first = cache.refresh(norad_id)
+        second = cache.refresh(norad_id)
+        conditional = stub.requests[-1][1]
+
+    if first is None or first.etag != '"v1"' or first.last_modified is None:
+        failures.append(f"validators not stored: {first and first.to_dict()}")
+    if conditional.get('If-None-Match') != '"v1"' or 'If-Modified-Since' not in conditional:
+        failures.append(f"refresh was not conditional: {conditional}")
+    if second is None or second.lines != RECORDS[norad_id] or second.etag != '"v1"':
+        failures.append(f"304 did not keep the entry: {second and second.to_dict()}")
+    elif first is not None and second.fetched_at < first.fetched_at:
+        failures.append("304 did not renew fetched_at")
+    return failures
+
+
+CHECKS = {
+    'slow_primary': check_slow_primary,
+    'failing_primary': check_failing_primary,
+    'missing_object': check_missing_object,
+    'concurrency_cap': check_concurrency_cap,
+    'cache_revalidation': check_cache_revalidation,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the TLE fetcher and cache against local stub servers.")
+    parser.add_argument('--filter', default='', help="only run checks whose name contains this")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for name, check in CHECKS.items():
+        if args.filter not in name:
+            continue
+        started = time.perf_counter()
+        failures = check()
+        print(f"{name:<20} {'ok' if not failures else 'FAILED':<7} {time.perf_counter() - started:6.2f}s")
+        for message in failures:
+            print(f"  {message}")
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
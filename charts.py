@@ -0,0 +1,119 @@
+"""
+ISS Pass Predictor - chart rendering.
+Renders the app's matplotlib charts to PNG bytes and caches them by a hash of
+the aggregated values they show, so a rerun that leaves the data unchanged
+(e.g. typing observation notes) reuses the image instead of building a new
+figure. Figures are created with matplotlib.figure.Figure rather than pyplot,
+so they are never registered with pyplot's figure manager and are released
+as soon as the PNG is written. matplotlib is only imported on a cache miss.
+"""
+
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 64
+CHART_DPI = 100
+
+
+def daily_pass_counts(rise_times):
+    """Number of passes per UTC date, sorted by date."""
+    return rise_times.dt.date.value_counts().sort_index()
+
+
+def chart_key(kind, *values):
+    """Content hash of a chart: its kind and the values it plots."""
+    return hashlib.sha1(repr((kind,) + values).encode('utf-8')).hexdigest()
+
+
+class ChartCache:
+    """Bounded LRU cache of rendered charts (PNG bytes) keyed by chart_key()."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+
+    def __len__(self):
+        return len(self._images)
+
+    def get_or_render(self, key, render):
+        """The cached PNG for `key`, or `render()`'s result, stored under `key`."""
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+        # Rendered outside the lock; two sessions racing on one key render it twice
+        image = render()
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+        return image
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+
+
+def _png(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', dpi=CHART_DPI)
+    figure.clear()
+    return buffer.getvalue()
+
+
+def render_daily_passes(dates, counts):
+    """PNG bar chart of passes per day."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(10, 4))
+    ax = figure.subplots()
+    labels = [str(date) for date in dates]
+    ax.bar(range(len(labels)), counts, color='skyblue', edgecolor='black')
+    ax.set_xticks(range(len(labels)), labels, rotation=45, ha='right')
+    ax.set_title('ISS Pass Frequency')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Number of Passes')
+    figure.tight_layout()
+    return _png(figure)
+
+
+def render_success_pie(successful, failed):
+    """PNG pie chart of successful and failed observations."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(4, 4))
+    ax = figure.subplots()
+    ax.pie([successful, failed], labels=['Successful', 'Failed'], colors=['#4CAF50', '#FF5722'],
+           autopct='%1.1f%%', startangle=90, wedgeprops={'edgecolor': 'black', 'linewidth': 1})
+    ax.set_title('Observation Success Rate')
+    return _png(figure)
+
+
+# Rendered charts shared by every session in this process
+chart_cache = ChartCache()
+
+
+def daily_passes_png(daily_counts, cache=None):
+    """Cached PNG of the passes-per-day chart for a daily_pass_counts() series."""
+    cache = chart_cache if cache is None else cache
+    dates = tuple(str(date) for date in daily_counts.index)
+    counts = tuple(int(count) for count in daily_counts.to_numpy())
+    return cache.get_or_render(chart_key('daily_passes', dates, counts),
+                               lambda: render_daily_passes(dates, counts))
+
+
+def success_pie_png(successful, total, cache=None):
+    """Cached PNG of the observation success pie."""
+    cache = chart_cache if cache is None else cache
+    successful, failed = int(successful), int(total) - int(successful)
+    return cache.get_or_render(chart_key('success_pie', successful, failed),
+                               lambda: render_success_pie(successful, failed))
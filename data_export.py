@@ -0,0 +1,128 @@
+"""
+ISS Pass Predictor - table export.
+Writes prediction and observation tables as CSV, Parquet or Arrow IPC without
+modifying the frames. Datetime columns are formatted by the CSV writer (or kept
+typed in Parquet/Arrow) instead of being converted to strings first, and rows
+are written in chunks, so large multi-site tables are never held as a full
+string copy. pyarrow is only imported by the Parquet/Arrow writers.
+"""
+
+import io
+
+# Timestamp format of the CSV exports
+CSV_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Rows per CSV chunk / Parquet row group / Arrow record batch
+DEFAULT_CHUNK_ROWS = 100_000
+
+EXPORT_FORMATS = {
+    'csv': ('.csv', 'text/csv'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('.arrow', 'application/vnd.apache.arrow.file'),
+}
+
+
+def _row_chunks(frame, chunk_rows):
+    # An empty frame still yields one (empty) chunk, so headers/schemas are written
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield start, frame.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(frame, chunk_rows=DEFAULT_CHUNK_ROWS, date_format=CSV_DATE_FORMAT):
+    """Yield the CSV text of `frame` in pieces of at most `chunk_rows` rows (header first)."""
+    for start, chunk in _row_chunks(frame, chunk_rows):
+        yield chunk.to_csv(index=False, header=start == 0, date_format=date_format)
+
+
+def write_csv(frame, target, chunk_rows=DEFAULT_CHUNK_ROWS, date_format=CSV_DATE_FORMAT):
+    """Write `frame` as CSV to a path or a text file object, one chunk at a time."""
+    if isinstance(target, str):
+        with open(target, 'w', encoding='utf-8', newline='') as f:
+            write_csv(frame, f, chunk_rows, date_format)
+        return
+    for text in iter_csv_chunks(frame, chunk_rows, date_format):
+        target.write(text)
+
+
+def csv_bytes(frame, chunk_rows=DEFAULT_CHUNK_ROWS, date_format=CSV_DATE_FORMAT):
+    """UTF-8 CSV of `frame`, encoded chunk by chunk into one buffer."""
+    buffer = io.BytesIO()
+    for text in iter_csv_chunks(frame, chunk_rows, date_format):
+        buffer.write(text.encode('utf-8'))
+    return buffer.getvalue()
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet and Arrow export need pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def iter_record_batches(frame, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Return (schema, iterator of Arrow record batches) for `frame`, converted chunk by chunk."""
+    pa = _pyarrow()
+    # One schema for the whole frame, so chunks with only missing values keep their type
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    # Via a Table: Arrow-backed string columns (pandas 3) may hold chunked arrays
+    batches = (batch
+               for _, chunk in _row_chunks(frame, chunk_rows)
+               for batch in pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                              .combine_chunks().to_batches())
+    return schema, batches
+
+
+def write_parquet(frame, target, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write `frame` to a Parquet file (path or binary file object), one row group per chunk."""
+    import pyarrow.parquet as pq
+
+    schema, batches = iter_record_batches(frame, chunk_rows)
+    with pq.ParquetWriter(target, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def write_arrow(frame, target, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write `frame` as an Arrow IPC (Feather v2) file, one record batch per chunk."""
+    pa = _pyarrow()
+    schema, batches = iter_record_batches(frame, chunk_rows)
+    with pa.ipc.new_file(target, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def parquet_bytes(frame, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """`frame` as the bytes of a Parquet file."""
+    buffer = io.BytesIO()
+    write_parquet(frame, buffer, chunk_rows)
+    return buffer.getvalue()
+
+
+def arrow_bytes(frame, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """`frame` as the bytes of an Arrow IPC file."""
+    buffer = io.BytesIO()
+    write_arrow(frame, buffer, chunk_rows)
+    return buffer.getvalue()
+
+
+def export_format(path, default='csv'):
+    """Export format implied by a file name's extension."""
+    for name, (extension, _) in EXPORT_FORMATS.items():
+        if str(path).lower().endswith(extension):
+            return name
+    if str(path).lower().endswith('.feather'):
+        return 'arrow'
+    return default
+
+
+def write_table(frame, target, fmt=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write `frame` to `target` as 'csv', 'parquet' or 'arrow' (default: from the extension)."""
+    fmt = fmt or export_format(target)
+    if fmt == 'csv':
+        write_csv(frame, target, chunk_rows)
+    elif fmt == 'parquet':
+        write_parquet(frame, target, chunk_rows)
+    elif fmt == 'arrow':
+        write_arrow(frame, target, chunk_rows)
+    else:
+        raise ValueError(f"Unknown export format: {fmt!r}")
@@ -0,0 +1,221 @@
+"""
+ISS Pass Predictor - stage timing.
+Lightweight span timing for the prediction pipeline. Code marks its stages with
+`span(name)`; spans are recorded into the trace that is active in the current
+context and cost almost nothing when no trace is active (e.g. in benchmarks or
+process-pool workers). Finished traces are aggregated per stage for a
+Prometheus text export and can be appended to a JSON lines log.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# One JSON object per finished trace is appended here when set
+TIMING_LOG_PATH = os.environ.get('ISS_TIMING_LOG')
+# Prometheus text-format metrics are rewritten here after every trace when set
+METRICS_FILE_PATH = os.environ.get('ISS_METRICS_FILE')
+
+_current_trace = ContextVar('iss_current_trace', default=None)
+
+
+class Span:
+    """One timed stage: name, nesting depth, start offset and duration (seconds)."""
+
+    __slots__ = ('name', 'depth', 'offset', 'seconds', 'attributes')
+
+    def __init__(self, name, depth, offset, seconds, attributes):
+        self.name = name
+        self.depth = depth
+        self.offset = offset
+        self.seconds = seconds
+        self.attributes = attributes
+
+    def to_dict(self):
+        return {'name': self.name, 'depth': self.depth, 'offset': round(self.offset, 6),
+                'seconds': round(self.seconds, 6), **self.attributes}
+
+
+class Trace:
+    """
+    The spans recorded during one run (e.g. one Streamlit script run).
+
+    Spans are stored in the order they finish; `depth` records how deeply
+    each one was nested in other spans.
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.started_at = datetime.now(timezone.utc)
+        self.spans = []
+        self.seconds = None
+        self._started = time.perf_counter()
+        self._depth = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def last_span_end(self):
+        """Seconds from the start of the trace to the end of its last finished span (0 if none)."""
+        return max((s.offset + s.seconds for s in self.spans), default=0.0)
+
+    def stage_totals(self):
+        """Total seconds per span name (a stage entered twice is summed)."""
+        totals = {}
+        for s in self.spans:
+            totals[s.name] = totals.get(s.name, 0.0) + s.seconds
+        return totals
+
+    def to_frame(self):
+        """Spans in start order with duration in ms and share of the whole run."""
+        total = self.seconds if self.seconds is not None else self.elapsed()
+        spans = sorted(self.spans, key=lambda s: (s.offset, s.depth))
+        return pd.DataFrame({
+            'stage': [s.name for s in spans],
+            'depth': [s.depth for s in spans],
+            'ms': [s.seconds * 1000 for s in spans],
+            'share': [s.seconds / total if total else 0.0 for s in spans],
+        })
+
+    def to_dict(self):
+        return {
+            'trace': self.name,
+            'started_at': self.started_at.isoformat(),
+            'seconds': None if self.seconds is None else round(self.seconds, 6),
+            **self.attributes,
+            'spans': [s.to_dict() for s in self.spans],
+        }
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the enclosed block as stage `name` of the active trace.
+
+    Extra keyword arguments are stored with the span (e.g. attempt=2). Does
+    nothing when no trace is active.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    depth = trace._depth
+    trace._depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        finished = time.perf_counter()
+        trace._depth = depth
+        trace.spans.append(Span(name, depth, started - trace._started, finished - started, attributes))
+
+
+def start_trace(name, **attributes):
+    """Create a trace and make it the active one for this context."""
+    trace = Trace(name, **attributes)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    """The active trace, or None."""
+    return _current_trace.get()
+
+
+def finish_trace(trace, log_path=None, metrics_path=None, seconds=None):
+    """
+    Stop `trace`, add it to the process-wide metrics and export it.
+
+    `seconds` replaces the measured duration, for traces finished after their
+    run had already ended. `log_path` and `metrics_path` default to
+    TIMING_LOG_PATH and METRICS_FILE_PATH; nothing is written when they are
+    unset.
+    """
+    trace.seconds = trace.elapsed() if seconds is None else seconds
+    if _current_trace.get() is trace:
+        _current_trace.set(None)
+    metrics.observe(trace)
+
+    log_path = log_path or TIMING_LOG_PATH
+    if log_path:
+        append_jsonl(trace, log_path)
+    metrics_path = metrics_path or METRICS_FILE_PATH
+    if metrics_path:
+        metrics.write(metrics_path)
+    return trace
+
+
+def append_jsonl(trace, path):
+    """Append one trace to a JSON lines file."""
+    line = json.dumps(trace.to_dict())
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+
+
+class StageMetrics:
+    """Per-stage count, sum and max of span durations over many traces."""
+
+    def __init__(self, prefix='iss'):
+        self.prefix = prefix
+        self.traces = 0
+        self.trace_seconds = 0.0
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, trace):
+        with self._lock:
+            self.traces += 1
+            self.trace_seconds += trace.seconds or 0.0
+            for s in trace.spans:
+                count, total, longest = self._stages.get(s.name, (0, 0.0, 0.0))
+                self._stages[s.name] = (count + 1, total + s.seconds, max(longest, s.seconds))
+
+    def snapshot(self):
+        """{stage: (count, sum_seconds, max_seconds)}"""
+        with self._lock:
+            return dict(self._stages)
+
+    def prometheus_text(self):
+        """The aggregates in Prometheus text exposition format."""
+        p = self.prefix
+        stages = sorted(self.snapshot().items())
+        lines = [
+            f"# HELP {p}_stage_seconds Time spent in each pipeline stage.",
+            f"# TYPE {p}_stage_seconds summary",
+        ]
+        for name, (count, total, _) in stages:
+            lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {count}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+        lines += [
+            f"# HELP {p}_stage_seconds_max Longest single span of each stage.",
+            f"# TYPE {p}_stage_seconds_max gauge",
+        ]
+        for name, (_, _, longest) in stages:
+            lines.append(f'{p}_stage_seconds_max{{stage="{name}"}} {longest:.6f}')
+        lines += [
+            f"# HELP {p}_runs_total Traced runs.",
+            f"# TYPE {p}_runs_total counter",
+            f"{p}_runs_total {self.traces}",
+            f"# HELP {p}_run_seconds_total Time spent in traced runs.",
+            f"# TYPE {p}_run_seconds_total counter",
+            f"{p}_run_seconds_total {self.trace_seconds:.6f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the Prometheus text to `path` atomically (node_exporter textfile style)."""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+
+# Aggregates for every trace finished in this process
+metrics = StageMetrics()
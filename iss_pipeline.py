@@ -0,0 +1,263 @@
+"""
+ISS Pass Predictor - headless pipeline and command-line interface.
+Runs the download -> predict -> filter -> export pipeline without Streamlit or
+matplotlib, e.g. as a nightly cron job for many sites. Skyfield, the
+timescale and the ephemeris are only loaded once a step needs them.
+
+Example:
+    python iss_pipeline.py --lat 39.9612 --lon -82.9988 --output iss_predictions.csv
+    python iss_pipeline.py --sites sites.csv --days 14 --threshold 30 --output best.csv
+"""
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from data_export import EXPORT_FORMATS, write_table
+from instrumentation import finish_trace, span, start_trace
+from iss_predictor import (add_visibility, get_timescale, normalize_sites,
+                           predict_passes_for_sites, predict_passes_parallel)
+from tle_cache import CELESTRAK_GP_URL, FALLBACK_TLE, ISS_NORAD_ID, TLECache
+from tle_catalog import STATIONS_URL, TLECatalog
+from tle_fetcher import fetch_tle_sets
+
+def _ignore(level, message):
+    pass
+
+
+def download_tle_data(cache=None, notify=None, gp_url=CELESTRAK_GP_URL, stations_url=STATIONS_URL,
+                      primary_attempts=3, secondary_attempts=2, initial_delay=3, timeout=20):
+    """
+    Return ISS TLE lines: from the cache, Celestrak, or the built-in fallback.
+
+    Elements in the on-disk TLE cache are returned without touching the
+    network (stale ones are revalidated in the background). Otherwise the
+    single-object GP query and the stations file are requested at the same
+    time, each retried with exponential backoff, and the first valid TLE set
+    wins (see tle_fetcher.AsyncTLEFetcher). Successful downloads are stored in
+    the cache. When both sources fail, an outdated cache entry is returned if
+    there is one (the same order as TLECache.get()), else the hardcoded
+    FALLBACK_TLE.
+
+    `notify(level, message)` receives progress messages; level is one of
+    'success', 'warning' or 'error'. Pass `cache=False` to skip the cache.
+    """
+    notify = notify or _ignore
+    if cache is None:
+        cache = TLECache()
+
+    # --- 0. Persistent cache: serve stored elements immediately ---
+    if cache:
+        cached = cache.lookup(ISS_NORAD_ID)
+        if cached is not None and cache.is_usable(cached):
+            if not cache.is_fresh(cached):
+                cache.refresh_in_background(ISS_NORAD_ID)
+            return cached.lines
+
+    # --- 1. Hedged download: primary (CATNR) and secondary (stations.txt) at once ---
+    with span('tle_fetch'):
+        result = fetch_tle_sets([ISS_NORAD_ID], gp_url=gp_url, stations_url=stations_url, timeout=timeout,
+                                primary_attempts=primary_attempts, secondary_attempts=secondary_attempts,
+                                retry_delay=initial_delay, notify=notify)[ISS_NORAD_ID]
+    if result is not None:
+        notify('success', f"✅ TLE data successfully retrieved from {result.source} source.")
+        if cache:
+            # Keep the validators so the next refresh can be a conditional request
+            cache.store(result.lines, etag=result.etag, last_modified=result.last_modified)
+        return result.lines
+
+    # --- 2. Outdated cache entry: still newer than the hardcoded elements ---
+    notify('error', "🚨 Network error: Both online TLE sources failed after multiple retries.")
+    if cache and cached is not None:
+        notify('warning', f"🚀 **Using cached TLE data from {cached.epoch:%Y-%m-%d %H:%M} UTC.** "
+                          "Predictions may be less accurate until a download succeeds.")
+        return cached.lines
+
+    # --- 3. Final Fallback: Use Hardcoded TLE ---
+    notify('warning', "🚀 **Using built-in fallback TLE data.** Predictions will still work, "
+                      "but may be slightly less accurate if the data is old.")
+    return FALLBACK_TLE
+
+
+def read_tle_file(path):
+    """Read the first TLE set (name line optional) from a local file."""
+    with open(path, encoding='utf-8') as f:
+        catalog = TLECatalog.from_lines(f.readlines(), validate=False)
+    if not len(catalog):
+        raise ValueError(f"No TLE set found in {path}")
+    return [catalog.names[0], catalog.line1s[0], catalog.line2s[0]]
+
+
+@lru_cache(maxsize=None)
+def get_ephemeris(directory=None):
+    """Load de421.bsp once per process, from `directory` or Skyfield's default location."""
+    from skyfield.api import Loader, load
+
+    loader = Loader(directory, verbose=False) if directory else load
+    return loader('de421.bsp')
+
+
+def read_sites(path):
+    """
+    Read observer sites from a CSV file.
+
+    Needs latitude and longitude columns; elevation (metres) defaults to 0 and
+    an optional site_id column names each site.
+    """
+    sites = pd.read_csv(path)
+    if 'elevation' not in sites.columns:
+        sites['elevation'] = 0.0
+    return normalize_sites(sites)
+
+
+def _predict_site_group(task):
+    """Process-pool worker: batched prediction for one group of sites."""
+    from skyfield.api import EarthSatellite
+
+    tle_lines, sites, start_jd, days, min_altitude = task
+    ts = get_timescale()
+    satellite = EarthSatellite(tle_lines[1], tle_lines[2], tle_lines[0], ts)
+    return predict_passes_for_sites(satellite, sites, ts.tt_jd(start_jd), days=days, min_altitude=min_altitude)
+
+
+def predict(tle_lines, sites, start, days=7, min_altitude=10.0, engine='batch', workers=1):
+    """
+    Predict passes for every site; returns site_id, pass_id and the PASS_COLUMNS.
+
+    `start` is a naive UTC datetime. The 'batch' engine propagates the
+    satellite once for a whole group of sites (see predict_passes_for_sites);
+    with several workers the sites are split into one group per worker. The
+    'find-events' engine runs the app's find_events() search for every site,
+    in parallel over sites and days (see predict_passes_parallel).
+    """
+    sites = normalize_sites(sites)
+    ts = get_timescale()
+    start_time = ts.from_datetime(start.replace(tzinfo=timezone.utc))
+
+    if engine == 'find-events':
+        return predict_passes_parallel(tle_lines, sites, start_time, days=days, min_altitude=min_altitude,
+                                       workers=workers)
+    if engine != 'batch':
+        raise ValueError(f"Unknown engine: {engine!r}")
+
+    tle_lines = [str(line) for line in tle_lines[:3]]
+    groups = np.array_split(np.arange(len(sites)), max(1, min(workers or 1, len(sites))))
+    tasks = [(tle_lines, sites.iloc[group], float(start_time.tt), days, min_altitude) for group in groups]
+    if len(tasks) == 1:
+        return _predict_site_group(tasks[0])
+    with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+        tables = list(executor.map(_predict_site_group, tasks))
+    return pd.concat(tables, ignore_index=True)
+
+
+def filter_visible(passes, tle_lines, sites, eph):
+    """Keep only the naked-eye visible passes of each site (see add_visibility())."""
+    from skyfield.api import EarthSatellite, Topos
+
+    ts = get_timescale()
+    satellite = EarthSatellite(tle_lines[1], tle_lines[2], tle_lines[0], ts)
+    sites = normalize_sites(sites).set_index('site_id')
+    tables = []
+    for site_id, site_passes in passes.groupby('site_id', sort=False):
+        site = sites.loc[site_id]
+        observer = Topos(site['latitude'], site['longitude'], elevation_m=site['elevation'])
+        tables.append(add_visibility(site_passes, satellite, observer, eph, ts))
+    if not tables:
+        return add_visibility(passes, satellite, None, eph, ts)
+    return pd.concat(tables, ignore_index=True)
+
+
+def filter_passes(passes, altitude_threshold):
+    """Passes whose maximum altitude is at least `altitude_threshold` degrees."""
+    return passes[passes['max_altitude'] >= altitude_threshold].reset_index(drop=True)
+
+
+def run_pipeline(sites, start=None, days=7, min_altitude=10.0, altitude_threshold=None, visible_only=False,
+                 tle_lines=None, engine='batch', workers=1, ephemeris_dir=None, notify=None):
+    """
+    Download (unless `tle_lines` is given), predict, filter and return the pass table.
+
+    `start` defaults to the current time (naive UTC). `altitude_threshold`
+    applies the app's "best passes" filter.
+    """
+    if tle_lines is None:
+        with span('download_tle'):
+            tle_lines = download_tle_data(notify=notify)
+        if not tle_lines:
+            raise RuntimeError("No TLE data available")
+    start = start or datetime.now(timezone.utc).replace(tzinfo=None)
+
+    with span('predict'):
+        passes = predict(tle_lines, sites, start, days=days, min_altitude=min_altitude,
+                         engine=engine, workers=workers)
+    if visible_only:
+        with span('visibility'):
+            passes = filter_visible(passes, tle_lines, sites, get_ephemeris(ephemeris_dir))
+    if altitude_threshold is not None:
+        passes = filter_passes(passes, altitude_threshold)
+    return passes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict ISS passes without the web UI.")
+    location = parser.add_argument_group("location (one site, or --sites for many)")
+    location.add_argument('--lat', type=float, help="latitude in degrees north")
+    location.add_argument('--lon', type=float, help="longitude in degrees east (negative for west)")
+    location.add_argument('--elevation', type=float, default=0.0, help="elevation in metres")
+    location.add_argument('--sites', help="CSV with latitude, longitude[, elevation, site_id] columns")
+    parser.add_argument('--start', type=datetime.fromisoformat, help="UTC start time, ISO format (default: now)")
+    parser.add_argument('--days', type=float, default=7, help="days to predict (default: 7)")
+    parser.add_argument('--min-altitude', type=float, default=10.0, help="rise/set altitude in degrees (default: 10)")
+    parser.add_argument('--threshold', type=float, help="only keep passes reaching this max altitude")
+    parser.add_argument('--visible-only', action='store_true', help="only keep naked-eye visible passes")
+    parser.add_argument('--tle-file', help="read the TLE from a local file instead of downloading it")
+    parser.add_argument('--ephemeris-dir', help="directory containing de421.bsp")
+    parser.add_argument('--engine', choices=['batch', 'find-events'], default='batch')
+    parser.add_argument('--workers', type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument('--output', '-o', default='-', help="output path, or - for CSV on stdout (default)")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS),
+                        help="output format (default: from the --output extension, else csv)")
+    parser.add_argument('--timings', action='store_true', help="print per-stage timings to stderr")
+    parser.add_argument('--quiet', '-q', action='store_true', help="only report errors")
+    args = parser.parse_args(argv)
+
+    if args.sites:
+        sites = read_sites(args.sites)
+    elif args.lat is not None and args.lon is not None:
+        sites = [(args.lat, args.lon, args.elevation)]
+    else:
+        parser.error("give --lat and --lon, or --sites")
+
+    def notify(level, message):
+        if level == 'error' or not args.quiet:
+            print(message, file=sys.stderr)
+
+    trace = start_trace('iss_pipeline')
+    tle_lines = read_tle_file(args.tle_file) if args.tle_file else None
+    passes = run_pipeline(sites, start=args.start, days=args.days, min_altitude=args.min_altitude,
+                          altitude_threshold=args.threshold, visible_only=args.visible_only,
+                          tle_lines=tle_lines, engine=args.engine, workers=args.workers,
+                          ephemeris_dir=args.ephemeris_dir, notify=notify)
+    with span('export'):
+        if args.output == '-':
+            write_table(passes, sys.stdout, 'csv')
+        else:
+            write_table(passes, args.output, args.format)
+    finish_trace(trace)
+
+    if not args.quiet:
+        print(f"{len(passes)} passes for {passes['site_id'].nunique()} site(s)", file=sys.stderr)
+    if args.timings:
+        for stage, seconds in trace.stage_totals().items():
+            print(f"{stage:<16} {seconds * 1000:10.1f} ms", file=sys.stderr)
+        print(f"{'total':<16} {trace.seconds * 1000:10.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,724 @@
+"""
+ISS Pass Predictor - core prediction engine.
+Pass geometry helpers shared by the Streamlit app and the notebook. This module
+has no Streamlit dependency so it can be imported anywhere.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+
+# Columns produced for every pass, in the order used by predictions_df
+PASS_COLUMNS = [
+    'rise_time', 'max_alt_time', 'set_time', 'max_altitude',
+    'rise_azimuth', 'set_azimuth', 'duration_minutes', 'brightness'
+]
+
+
+@lru_cache(maxsize=1)
+def get_timescale():
+    """Load the Skyfield timescale once per process."""
+    from skyfield.api import load
+
+    return load.timescale()
+
+
+def find_pass_triples(events):
+    """
+    Return the indices of every complete (Rise, Max, Set) sequence in `events`.
+
+    Skyfield's find_events() labels events 0=Rise, 1=Max Alt, 2=Set. A pass is
+    three consecutive events 0, 1, 2. Two such triples can never overlap, so a
+    NumPy mask gives the same grouping as walking the events one by one.
+    """
+    events = np.asarray(events)
+    if len(events) < 3:
+        return np.empty(0, dtype=int)
+    starts = (events[:-2] == 0) & (events[1:-1] == 1) & (events[2:] == 2)
+    return np.flatnonzero(starts)
+
+
+def _naive_utc(times):
+    """Convert a Skyfield Time array into timezone-naive UTC pandas timestamps."""
+    return pd.DatetimeIndex(times.utc_datetime()).tz_localize(None)
+
+
+def build_pass_table(rise_times, max_alt_times, set_times, max_altitude,
+                     rise_azimuth, set_azimuth, distance_km):
+    """
+    Assemble the columnar pass table from per-pass arrays.
+
+    Times are Skyfield Time arrays, angles are in degrees and `distance_km` is
+    the range at culmination. Rounding matches the original per-pass output.
+    """
+    duration_minutes = (set_times - rise_times) * 24 * 60
+    # Simple approximation of visual brightness (magnitude). Lower is brighter.
+    # Using 400km as a reference for roughly 0 magnitude
+    brightness = -2.0 - (400 / np.asarray(distance_km))
+
+    return pd.DataFrame({
+        'rise_time': _naive_utc(rise_times),
+        'max_alt_time': _naive_utc(max_alt_times),
+        'set_time': _naive_utc(set_times),
+        'max_altitude': np.round(max_altitude, 2),
+        'rise_azimuth': np.round(rise_azimuth, 1),
+        'set_azimuth': np.round(set_azimuth, 1),
+        'duration_minutes': np.round(duration_minutes, 1),
+        'brightness': np.round(brightness, 2),
+    }, columns=PASS_COLUMNS)
+
+
+def find_pass_table(satellite, observer_location, start_time, days=7, min_altitude=10.0):
+    """
+    Calculate all ISS passes for a time period as a single DataFrame.
+
+    Rise, culmination and set events are grouped with NumPy masks and the
+    topocentric geometry for every event is evaluated in one batched Skyfield
+    call, instead of three `.at()`/`.altaz()` calls per pass.
+
+    Parameters:
+    -----------
+    satellite : skyfield.api.EarthSatellite
+        The satellite object created from TLE data
+    observer_location : skyfield.toposlib.Topos
+        The observer's location on Earth
+    start_time : skyfield.timelib.Time
+        When to start searching for passes
+    days : float, optional
+        How many days ahead to calculate passes (default: 7)
+    min_altitude : float, optional
+        Minimum altitude in degrees for rise/set (default: 10.0)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        One row per complete pass with the columns in PASS_COLUMNS.
+    """
+    end_time = start_time + days
+    with span('find_events', days=float(days)):
+        t, events = satellite.find_events(observer_location, start_time, end_time, altitude_degrees=min_altitude)
+
+    starts = find_pass_triples(events)
+    n = len(starts)
+    if n == 0:
+        return pd.DataFrame(columns=PASS_COLUMNS)
+
+    # Evaluate rise, culmination and set for every pass in one call
+    with span('altaz', passes=n):
+        event_times = t[np.concatenate([starts, starts + 1, starts + 2])]
+        alt, az, distance = (satellite - observer_location).at(event_times).altaz()
+
+    with span('build_table'):
+        return build_pass_table(
+            rise_times=event_times[:n],
+            max_alt_times=event_times[n:2 * n],
+            set_times=event_times[2 * n:],
+            max_altitude=alt.degrees[n:2 * n],
+            rise_azimuth=az.degrees[:n],
+            set_azimuth=az.degrees[2 * n:],
+            distance_km=distance.km[n:2 * n],
+        )
+
+
+
+def find_pass_tables(satellites, observer_location, start_time, days=7, min_altitude=10.0):
+    """
+    Run find_pass_table() for several satellites and stack the results.
+
+    `satellites` maps a display name to an EarthSatellite, e.g. the output of
+    TLECatalog.satellites(). Returns a long-format DataFrame with a satellite
+    column and a pass_id that restarts at 1 for every satellite.
+    """
+    tables = []
+    for name, satellite in satellites.items():
+        table = find_pass_table(satellite, observer_location, start_time, days=days, min_altitude=min_altitude)
+        table.insert(0, 'satellite', name)
+        table.insert(1, 'pass_id', range(1, len(table) + 1))
+        tables.append(table)
+    if not tables:
+        return pd.DataFrame(columns=['satellite', 'pass_id'] + PASS_COLUMNS)
+    return pd.concat(tables, ignore_index=True)
+
+
+# --- Visibility (sunlit satellite, dark observer) ---
+
+# Spacing of the samples taken inside each pass
+DEFAULT_VISIBILITY_STEP_SECONDS = 10.0
+# The sky counts as dark once the sun is below civil twilight
+DEFAULT_MAX_SUN_ALTITUDE = -6.0
+
+_UNIX_EPOCH = pd.Timestamp('1970-01-01')
+
+
+def _sample_passes(rise_times, set_times, step_seconds):
+    """
+    Sample every pass from rise to set on a fixed cadence.
+
+    Returns (owner, seconds): the pass index of each sample and its time as
+    seconds since 1970-01-01 UTC. Each pass's set time is included as its
+    last sample.
+    """
+    rise = ((pd.DatetimeIndex(rise_times) - _UNIX_EPOCH) / pd.Timedelta(seconds=1)).to_numpy()
+    set_ = ((pd.DatetimeIndex(set_times) - _UNIX_EPOCH) / pd.Timedelta(seconds=1)).to_numpy()
+    counts = np.floor((set_ - rise) / step_seconds).astype(int) + 1
+    owner = np.repeat(np.arange(len(rise)), counts)
+    # Position of each sample within its own pass
+    within = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    seconds = rise[owner] + within * step_seconds
+
+    owner = np.concatenate([owner, np.arange(len(rise))])
+    seconds = np.concatenate([seconds, set_])
+    order = np.lexsort((seconds, owner))
+    return owner[order], seconds[order]
+
+
+def _utc_times(ts, seconds):
+    """Skyfield Time array for UTC seconds since 1970 (leap seconds excluded, as in pandas)."""
+    stamps = _UNIX_EPOCH + pd.to_timedelta(seconds, unit='s')
+    return ts.utc(stamps.year.to_numpy(), stamps.month.to_numpy(), stamps.day.to_numpy(),
+                  stamps.hour.to_numpy(), stamps.minute.to_numpy(),
+                  stamps.second.to_numpy() + stamps.microsecond.to_numpy() / 1e6)
+
+
+def _sun_altitude(observer_location, eph, times):
+    """Apparent altitude of the sun (degrees) seen from the observer at every time."""
+    alt, _, _ = (eph['earth'] + observer_location).at(times).observe(eph['sun']).apparent().altaz()
+    return alt.degrees
+
+
+def add_visibility(passes, satellite, observer_location, eph, ts=None,
+                   step_seconds=DEFAULT_VISIBILITY_STEP_SECONDS,
+                   max_sun_altitude=DEFAULT_MAX_SUN_ALTITUDE, drop_invisible=True):
+    """
+    Add the naked-eye visible segment of every pass.
+
+    A pass is visible while the satellite is sunlit and the sun is below
+    `max_sun_altitude` at the observer. Each pass is sampled every
+    `step_seconds` between rise and set. Sunlight and sun altitude are then
+    evaluated for all samples of all passes in one batched Skyfield call each.
+
+    Adds visible_start, visible_end (NaT when never visible) and
+    visible_minutes (NaN when never visible) columns. Passes that can never be seen are dropped unless
+    `drop_invisible` is False.
+    """
+    passes = passes.copy()
+    if passes.empty:
+        for column in ('visible_start', 'visible_end'):
+            passes[column] = pd.Series(dtype='datetime64[ns]')
+        passes['visible_minutes'] = pd.Series(dtype=float)
+        return passes
+
+    ts = ts or get_timescale()
+    owner, seconds = _sample_passes(passes['rise_time'], passes['set_time'], step_seconds)
+    times = _utc_times(ts, seconds)
+
+    with span('sunlight', samples=len(seconds)):
+        visible = satellite.at(times).is_sunlit(eph) & (_sun_altitude(observer_location, eph, times) < max_sun_altitude)
+
+    # First and last visible sample of each pass (samples are grouped by pass in time order)
+    visible_owner = owner[visible]
+    visible_seconds = seconds[visible]
+    start = np.full(len(passes), np.nan)
+    end = np.full(len(passes), np.nan)
+    first = np.unique(visible_owner, return_index=True)[1]
+    last = len(visible_owner) - 1 - np.unique(visible_owner[::-1], return_index=True)[1]
+    start[visible_owner[first]] = visible_seconds[first]
+    end[visible_owner[last]] = visible_seconds[last]
+
+    passes['visible_start'] = (_UNIX_EPOCH + pd.to_timedelta(start, unit='s')).round('us')
+    passes['visible_end'] = (_UNIX_EPOCH + pd.to_timedelta(end, unit='s')).round('us')
+    # NaN (not 0) for passes that are never visible, so they differ from a one-sample segment
+    passes['visible_minutes'] = np.round((end - start) / 60, 1)
+
+    if drop_invisible:
+        passes = passes[passes['visible_start'].notna()].reset_index(drop=True)
+    return passes
+
+# --- Multi-observer batch prediction ---
+
+# Coarse sampling step for the shared propagation grid. Short enough that no
+# LEO pass can hide between two samples once culminations are refined.
+DEFAULT_GRID_STEP_SECONDS = 60.0
+# Bisection iterations; 60 s / 2**17 is well under a millisecond
+_REFINE_ITERATIONS = 17
+# Culmination candidates this far below the threshold on the grid are skipped
+_CULMINATION_MARGIN_DEG = 20.0
+
+
+def normalize_sites(sites):
+    """
+    Return observer sites as a DataFrame with site_id, latitude, longitude, elevation.
+
+    `sites` may be a DataFrame with latitude/longitude/elevation columns (and an
+    optional site_id column) or an iterable of (lat, lon, elevation_m) rows.
+    """
+    if isinstance(sites, pd.DataFrame):
+        missing = {'latitude', 'longitude', 'elevation'} - set(sites.columns)
+        if missing:
+            raise ValueError(f"Sites table is missing columns: {sorted(missing)}")
+        frame = sites.reset_index(drop=True)
+        site_ids = frame['site_id'] if 'site_id' in frame.columns else frame.index
+    else:
+        frame = pd.DataFrame(list(sites), columns=['latitude', 'longitude', 'elevation'])
+        site_ids = frame.index
+
+    return pd.DataFrame({
+        'site_id': np.asarray(site_ids),
+        'latitude': frame['latitude'].astype(float).to_numpy(),
+        'longitude': frame['longitude'].astype(float).to_numpy(),
+        'elevation': frame['elevation'].astype(float).to_numpy(),
+    })
+
+
+def _site_geometry(sites):
+    """Earth-fixed site positions (S, 3) in km and local east/north/up bases (S, 3, 3)."""
+    from skyfield.api import iers2010
+
+    lat = np.radians(sites['latitude'].to_numpy())
+    lon = np.radians(sites['longitude'].to_numpy())
+    # Same Earth model as Topos, so altitudes agree with the single-site path
+    position = iers2010.latlon(sites['latitude'].to_numpy(), sites['longitude'].to_numpy(),
+                               elevation_m=sites['elevation'].to_numpy())
+    xyz = np.atleast_2d(position.itrs_xyz.km.T)
+
+    sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+    sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+    zero = np.zeros_like(lat)
+    basis = np.stack([
+        np.stack([-sin_lon, cos_lon, zero], axis=-1),                              # east
+        np.stack([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat], axis=-1),      # north
+        np.stack([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat], axis=-1),        # up
+    ], axis=1)
+    return xyz, basis
+
+
+def _satellite_itrs(satellite, times):
+    """
+    SGP4-propagate `satellite` and return Earth-fixed positions (N, 3) in km.
+
+    SGP4 works in the TEME frame, which differs from the Earth-fixed frame by
+    a single rotation through Greenwich mean sidereal time. Applying it here
+    directly skips Skyfield's full nutation model, which otherwise dominates
+    the cost of every batched evaluation.
+    """
+    from skyfield.sgp4lib import theta_GMST1982
+
+    # SGP4 takes UTC Julian dates (AIAA 2006-6753); UTC = UT1 - DUT1
+    whole, fraction = np.broadcast_arrays(np.atleast_1d(times.whole),
+                                          np.atleast_1d(times.ut1_fraction - times.dut1 / 86400.0))
+    _, position, _ = satellite.model.sgp4_array(whole, fraction)
+    theta, _ = theta_GMST1982(times.whole, times.ut1_fraction)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y, z = position.T
+    return np.stack([cos_t * x + sin_t * y, cos_t * y - sin_t * x, z], axis=-1)
+
+
+def _enu_altaz(offset_km, basis):
+    """Altitude, azimuth (degrees) and range (km) of Earth-fixed offsets in a local frame."""
+    enu = np.einsum('...ij,...j->...i', basis, offset_km)
+    distance = np.linalg.norm(enu, axis=-1)
+    alt = np.degrees(np.arcsin(enu[..., 2] / distance))
+    az = np.degrees(np.arctan2(enu[..., 0], enu[..., 1])) % 360.0
+    return alt, az, distance
+
+
+def _altaz_at(satellite, ts, jd, site_xyz, basis):
+    """Topocentric alt/az/range at TT Julian dates `jd`, one (site, time) pair per element."""
+    if len(jd) == 0:
+        empty = np.empty(0)
+        return empty, empty, empty
+    sat_xyz = _satellite_itrs(satellite, ts.tt_jd(jd))
+    return _enu_altaz(sat_xyz - site_xyz, basis)
+
+
+def _refine_crossings(satellite, ts, lo, hi, site_xyz, basis, min_altitude, rising):
+    """Bisect every [lo, hi] bracket in parallel for the time altitude crosses min_altitude."""
+    for _ in range(_REFINE_ITERATIONS):
+        mid = 0.5 * (lo + hi)
+        alt, _, _ = _altaz_at(satellite, ts, mid, site_xyz, basis)
+        above = alt >= min_altitude
+        # Rising: the crossing is before mid when mid is already above
+        before = above if rising else ~above
+        hi = np.where(before, mid, hi)
+        lo = np.where(before, lo, mid)
+    return 0.5 * (lo + hi)
+
+
+def _refine_maxima(satellite, ts, lo, hi, site_xyz, basis):
+    """Bisect every [lo, hi] bracket in parallel on the sign of d(altitude)/dt."""
+    delta = 0.01 / 86400.0
+    for _ in range(_REFINE_ITERATIONS + 1):
+        mid = 0.5 * (lo + hi)
+        alt, _, _ = _altaz_at(satellite, ts, np.concatenate([mid - delta, mid + delta]),
+                              np.concatenate([site_xyz, site_xyz]), np.concatenate([basis, basis]))
+        n = len(mid)
+        climbing = alt[n:] > alt[:n]
+        lo = np.where(climbing, mid, lo)
+        hi = np.where(climbing, hi, mid)
+    return 0.5 * (lo + hi)
+
+
+def predict_passes_for_sites(satellite, sites, start_time, days=7, min_altitude=10.0,
+                             step_seconds=DEFAULT_GRID_STEP_SECONDS):
+    """
+    Predict passes for many observer sites with a single shared propagation.
+
+    The satellite is propagated once on a common time grid and converted to
+    Earth-fixed coordinates. Each site then only needs a cheap rotation into
+    its local horizon frame to find culminations and threshold crossings on the
+    grid. The crossings and culminations of all sites are refined together by
+    batched bisection, so SGP4 is evaluated on a handful of arrays in total
+    instead of one full find_events() search per site. Event times agree with
+    find_events() to well under a second.
+
+    Parameters:
+    -----------
+    satellite : skyfield.api.EarthSatellite
+        The satellite object created from TLE data
+    sites : pandas.DataFrame or iterable of (lat, lon, elevation_m)
+        Observer sites; see normalize_sites()
+    start_time : skyfield.timelib.Time
+        When to start searching for passes
+    days : float, optional
+        How many days ahead to calculate passes (default: 7)
+    min_altitude : float, optional
+        Minimum altitude in degrees for rise/set (default: 10.0)
+    step_seconds : float, optional
+        Spacing of the shared propagation grid (default: 60)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Long-format table with site_id, pass_id and the PASS_COLUMNS; pass_id
+        restarts at 1 for every site, like the single-site predictions_df.
+    """
+    sites = normalize_sites(sites)
+    if sites.empty:
+        return pd.DataFrame(columns=['site_id', 'pass_id'] + PASS_COLUMNS)
+    ts = start_time.ts
+    site_xyz, basis = _site_geometry(sites)
+
+    # --- 1. One propagation on the shared grid ---
+    step = step_seconds / 86400.0
+    grid = start_time.tt + np.arange(0.0, days + step / 2, step)
+    grid[-1] = min(grid[-1], start_time.tt + days)
+    sat_grid = _satellite_itrs(satellite, ts.tt_jd(grid))
+
+    # --- 2. Per-site projection: find culmination brackets on the grid ---
+    grid_alt = []
+    max_site, max_lo, max_hi = [], [], []
+    for s in range(len(sites)):
+        alt, _, _ = _enu_altaz(sat_grid - site_xyz[s], basis[s])
+        grid_alt.append(alt)
+        peaks = np.flatnonzero((alt[1:-1] > alt[:-2]) & (alt[1:-1] >= alt[2:])
+                               & (alt[1:-1] > min_altitude - _CULMINATION_MARGIN_DEG)) + 1
+        max_site.append(np.full(len(peaks), s))
+        max_lo.append(grid[peaks - 1])
+        max_hi.append(grid[peaks + 1])
+
+    max_site = np.concatenate(max_site).astype(int)
+    max_jd = _refine_maxima(satellite, ts, np.concatenate(max_lo), np.concatenate(max_hi),
+                            site_xyz[max_site], basis[max_site])
+    max_alt, _, _ = _altaz_at(satellite, ts, max_jd, site_xyz[max_site], basis[max_site])
+    keep = max_alt >= min_altitude
+    max_site, max_jd, max_alt = max_site[keep], max_jd[keep], max_alt[keep]
+
+    # --- 3. Per-site threshold crossings between grid samples and culminations ---
+    cross_site, cross_lo, cross_hi, cross_rising = [], [], [], []
+    for s in range(len(sites)):
+        mine = max_site == s
+        jd = np.concatenate([grid, max_jd[mine]])
+        alt = np.concatenate([grid_alt[s], max_alt[mine]])
+        order = np.argsort(jd, kind='stable')
+        jd, above = jd[order], alt[order] >= min_altitude
+        change = np.flatnonzero(above[1:] != above[:-1])
+        cross_site.append(np.full(len(change), s))
+        cross_lo.append(jd[change])
+        cross_hi.append(jd[change + 1])
+        cross_rising.append(above[change + 1])
+
+    cross_site = np.concatenate(cross_site).astype(int)
+    cross_lo, cross_hi = np.concatenate(cross_lo), np.concatenate(cross_hi)
+    cross_rising = np.concatenate(cross_rising).astype(bool)
+    cross_jd = np.empty(len(cross_site))
+    for rising in (True, False):
+        sel = cross_rising == rising
+        cross_jd[sel] = _refine_crossings(satellite, ts, cross_lo[sel], cross_hi[sel],
+                                          site_xyz[cross_site[sel]], basis[cross_site[sel]],
+                                          min_altitude, rising)
+
+    # --- 4. Group events into (Rise, Max, Set) triples per site ---
+    event_site = np.concatenate([cross_site, max_site])
+    event_jd = np.concatenate([cross_jd, max_jd])
+    event_code = np.concatenate([np.where(cross_rising, 0, 2), np.ones(len(max_site), dtype=int)])
+    order = np.lexsort((event_jd, event_site))
+    event_site, event_jd, event_code = event_site[order], event_jd[order], event_code[order]
+
+    starts = find_pass_triples(event_code)
+    starts = starts[event_site[starts] == event_site[starts + 2]]
+    n = len(starts)
+    if n == 0:
+        return pd.DataFrame(columns=['site_id', 'pass_id'] + PASS_COLUMNS)
+
+    # --- 5. Geometry for every event of every site in one batched call ---
+    idx = np.concatenate([starts, starts + 1, starts + 2])
+    owner = event_site[idx]
+    alt, az, distance = _altaz_at(satellite, ts, event_jd[idx], site_xyz[owner], basis[owner])
+    event_times = ts.tt_jd(event_jd[idx])
+
+    table = build_pass_table(
+        rise_times=event_times[:n],
+        max_alt_times=event_times[n:2 * n],
+        set_times=event_times[2 * n:],
+        max_altitude=alt[n:2 * n],
+        rise_azimuth=az[:n],
+        set_azimuth=az[2 * n:],
+        distance_km=distance[n:2 * n],
+    )
+    pass_site = event_site[starts]
+    table.insert(0, 'site_id', sites['site_id'].to_numpy()[pass_site])
+    table.insert(1, 'pass_id', pd.Series(pass_site).groupby(pass_site).cumcount().to_numpy() + 1)
+    return table
+
+
+# --- Parallel pass search ---
+
+DEFAULT_CHUNK_DAYS = 1.0
+# Longer than any LEO pass, so a pass cut at one chunk edge is whole in the neighbour
+DEFAULT_CHUNK_OVERLAP_MINUTES = 30.0
+# Passes of the same site whose culminations are closer than this are duplicates
+_DUPLICATE_TOLERANCE = pd.Timedelta(minutes=10)
+
+
+def _search_chunk(task):
+    """Process-pool worker: run find_pass_table() for one (site, time chunk) task."""
+    from skyfield.api import EarthSatellite, Topos
+
+    tle_lines, site_index, (latitude, longitude, elevation), start_jd, end_jd, min_altitude = task
+    ts = get_timescale()
+    satellite = EarthSatellite(tle_lines[1], tle_lines[2], tle_lines[0], ts)
+    observer = Topos(float(latitude), float(longitude), elevation_m=float(elevation))
+    table = find_pass_table(satellite, observer, ts.tt_jd(start_jd), days=end_jd - start_jd,
+                            min_altitude=min_altitude)
+    table.insert(0, 'site_index', site_index)
+    return table
+
+
+def predict_passes_parallel(tle_lines, sites, start_time, days=7, min_altitude=10.0, workers=None,
+                            chunk_days=DEFAULT_CHUNK_DAYS,
+                            overlap_minutes=DEFAULT_CHUNK_OVERLAP_MINUTES):
+    """
+    Run the find_events() pass search on a process pool, split by site and time.
+
+    The window is cut into `chunk_days` pieces. Interior chunk edges are widened
+    by `overlap_minutes` so a pass crossing an edge is complete in at least one
+    chunk; the outer edges are not widened, so passes cut off by the overall
+    window are dropped exactly as in the serial search. Per-chunk results are
+    merged, de-duplicated on culmination time and only then given pass_ids.
+
+    Parameters:
+    -----------
+    tle_lines : list of str
+        Name line and the two TLE lines, as returned by download_tle_data()
+    sites : pandas.DataFrame or iterable of (lat, lon, elevation_m)
+        Observer sites; see normalize_sites()
+    start_time : skyfield.timelib.Time
+        When to start searching for passes
+    days : float, optional
+        How many days ahead to calculate passes (default: 7)
+    min_altitude : float, optional
+        Minimum altitude in degrees for rise/set (default: 10.0)
+    workers : int, optional
+        Number of worker processes (default: one per CPU). With 1 the tasks
+        run in the calling process.
+    chunk_days : float, optional
+        Length of each time chunk (default: 1 day)
+    overlap_minutes : float, optional
+        Widening of interior chunk edges (default: 30 minutes)
+
+    Returns:
+    --------
+    pandas.DataFrame
+        Long-format table with site_id, pass_id and the PASS_COLUMNS. The passes
+        and pass_ids match find_pass_table() for every site; event times agree to
+        within the half-second tolerance find_events() searches to.
+    """
+    sites = normalize_sites(sites)
+    tle_lines = [str(line) for line in tle_lines[:3]]
+    start_jd = float(start_time.tt)
+    end_jd = start_jd + days
+    overlap = overlap_minutes / (24 * 60)
+
+    edges = np.append(np.arange(start_jd, end_jd, chunk_days), end_jd)
+    tasks = []
+    for site_index, site in enumerate(sites[['latitude', 'longitude', 'elevation']].itertuples(index=False)):
+        for lo, hi in zip(edges[:-1], edges[1:]):
+            search_lo = lo - overlap if lo > start_jd else lo
+            search_hi = hi + overlap if hi < end_jd else hi
+            tasks.append((tle_lines, site_index, tuple(site), search_lo, search_hi, min_altitude))
+
+    if workers == 1:
+        tables = [_search_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = list(executor.map(_search_chunk, tasks))
+
+    columns = ['site_id', 'pass_id'] + PASS_COLUMNS
+    tables = [table for table in tables if not table.empty]
+    if not tables:
+        return pd.DataFrame(columns=columns)
+
+    merged = pd.concat(tables, ignore_index=True)
+    merged = merged.sort_values(['site_index', 'max_alt_time'], kind='stable').reset_index(drop=True)
+    gap = merged.groupby('site_index')['max_alt_time'].diff()
+    merged = merged[~(gap < _DUPLICATE_TOLERANCE)].reset_index(drop=True)
+
+    site_index = merged.pop('site_index').to_numpy()
+    merged.insert(0, 'site_id', sites['site_id'].to_numpy()[site_index])
+    merged.insert(1, 'pass_id', merged.groupby(site_index).cumcount().to_numpy() + 1)
+    return merged[columns]
+
+
+# --- Dense sky-path and ground-track sampling ---
+
+DEFAULT_PATH_STEP_SECONDS = 1.0
+
+# Per-sample arrays of PassPaths, all float32
+PATH_FIELDS = ['time_offset', 'altitude', 'azimuth', 'range_km', 'latitude', 'longitude']
+
+# First eccentricity squared of the WGS84 ellipsoid, e² = f(2 - f)
+WGS84_FLATTENING = 1.0 / 298.257223563
+WGS84_E2 = WGS84_FLATTENING * (2.0 - WGS84_FLATTENING)
+
+
+class PassPaths:
+    """
+    Densely sampled sky paths and ground tracks of a set of passes.
+
+    Samples of all passes are stored back to back in flat, contiguous float32
+    arrays (one per field in PATH_FIELDS). Pass i occupies the slice
+    offsets[i]:offsets[i + 1]. `time_offset` is seconds since that pass's
+    `start` (datetime64 per pass), which keeps float32 precise to milliseconds.
+    Angles are in degrees; latitude/longitude are the sub-satellite point.
+    """
+
+    def __init__(self, pass_id, start, offsets, time_offset, altitude, azimuth, range_km, latitude, longitude):
+        self.pass_id = pass_id
+        self.start = start
+        self.offsets = offsets
+        self.time_offset = time_offset
+        self.altitude = altitude
+        self.azimuth = azimuth
+        self.range_km = range_km
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def __len__(self):
+        return len(self.pass_id)
+
+    @property
+    def n_samples(self):
+        return int(self.offsets[-1])
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in PATH_FIELDS) + self.offsets.nbytes
+
+    def path(self, i):
+        """{field: array} for pass number i (views into the flat arrays, no copy)."""
+        section = slice(self.offsets[i], self.offsets[i + 1])
+        return {name: getattr(self, name)[section] for name in PATH_FIELDS}
+
+    def times(self):
+        """Absolute sample times as a datetime64[ns] array."""
+        counts = np.diff(self.offsets)
+        return np.repeat(self.start, counts) + (self.time_offset.astype(np.float64) * 1e9).astype('timedelta64[ns]')
+
+    def sample_pass_ids(self):
+        """pass_id of every sample."""
+        return np.repeat(self.pass_id, np.diff(self.offsets))
+
+    def to_frame(self):
+        """Long-format DataFrame (one row per sample) for export; copies the arrays."""
+        return pd.DataFrame({'pass_id': self.sample_pass_ids(), 'time': self.times(),
+                             **{name: getattr(self, name) for name in PATH_FIELDS[1:]}})
+
+
+def _float32(values):
+    return np.ascontiguousarray(values, dtype=np.float32)
+
+
+def _geodetic_latlon(xyz_km):
+    """WGS84 geodetic latitude and longitude (degrees) of Earth-fixed positions (N, 3)."""
+    from skyfield.api import wgs84
+
+    x, y, z = xyz_km.T
+    a, e2 = wgs84.radius.km, WGS84_E2
+    r = np.hypot(x, y)
+    lat = np.arctan2(z, r)
+    # Same fixed-point iteration as Skyfield's Geoid
+    for _ in range(3):
+        sin_lat = np.sin(lat)
+        radius = a / np.sqrt(1.0 - e2 * sin_lat * sin_lat)
+        lat = np.arctan2(z + radius * e2 * sin_lat, r)
+    return np.degrees(lat), np.degrees(np.arctan2(y, x))
+
+
+def sample_pass_paths(passes, satellite, sites, step_seconds=DEFAULT_PATH_STEP_SECONDS, ts=None):
+    """
+    Sample the sky path and ground track of every pass on a fixed cadence.
+
+    All samples of all passes are propagated in one SGP4 call and rotated
+    into each site's horizon frame with NumPy, like predict_passes_for_sites();
+    positions agree with Skyfield's altaz() and wgs84.subpoint_of() to the
+    float32 resolution of the output.
+
+    Parameters:
+    -----------
+    passes : pandas.DataFrame
+        Pass table with rise_time and set_time (and pass_id, site_id if present)
+    satellite : skyfield.api.EarthSatellite
+        The satellite object created from TLE data
+    sites : tuple or pandas.DataFrame
+        One (lat, lon, elevation_m) site, or a sites table (see
+        normalize_sites()) matched to the passes by site_id
+    step_seconds : float, optional
+        Sampling cadence; each pass's set time is always included (default: 1)
+    ts : skyfield.timelib.Timescale, optional
+
+    Returns:
+    --------
+    PassPaths
+    """
+    sites = normalize_sites(sites if isinstance(sites, pd.DataFrame) else [sites])
+    pass_id = (passes['pass_id'] if 'pass_id' in passes.columns else pd.RangeIndex(len(passes))).to_numpy()
+    if 'site_id' in passes.columns:
+        site_index = pd.Index(sites['site_id']).get_indexer(passes['site_id'])
+        if (site_index < 0).any():
+            raise ValueError("Passes refer to site_ids that are not in `sites`")
+    elif len(sites) == 1:
+        site_index = np.zeros(len(passes), dtype=int)
+    else:
+        raise ValueError("Passes need a site_id column when several sites are given")
+
+    start = pd.DatetimeIndex(passes['rise_time']).as_unit('ns').to_numpy()
+    owner, seconds = _sample_passes(passes['rise_time'], passes['set_time'], step_seconds)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(owner, minlength=len(passes)))])
+    if len(seconds) == 0:
+        empty = np.empty(0, dtype=np.float32)
+        return PassPaths(pass_id, start, offsets, *(empty,) * len(PATH_FIELDS))
+
+    ts = ts or get_timescale()
+    sat_xyz = _satellite_itrs(satellite, _utc_times(ts, seconds))
+    site_xyz, basis = _site_geometry(sites)
+    sample_site = site_index[owner]
+    alt, az, distance = _enu_altaz(sat_xyz - site_xyz[sample_site], basis[sample_site])
+    latitude, longitude = _geodetic_latlon(sat_xyz)
+
+    rise_seconds = (start - np.datetime64('1970-01-01', 'ns')) / np.timedelta64(1, 's')
+    return PassPaths(pass_id, start, offsets, _float32(seconds - rise_seconds[owner]),
+                     _float32(alt), _float32(az), _float32(distance), _float32(latitude), _float32(longitude))
@@ -0,0 +1,304 @@
+"""
+ISS Pass Predictor - observation store.
+Observations are appended to a SQLite database instead of being concatenated
+onto a DataFrame, so logging is O(1), lookups by site, pass_id and time range
+use indexes, and the log survives restarts. Success counts, per-weather tallies
+and altitude error sums are updated in the same transaction as each append, so
+analytics read small summary rows instead of re-aggregating the log.
+
+Every observation belongs to one observer's log and records the culmination
+time of its pass, which identifies the pass across sessions; pass_ids are
+only meaningful within the session that predicted them.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+DEFAULT_DB_PATH = os.environ.get('ISS_OBSERVATION_DB', 'iss_observations.db')
+
+# Column order of observation frames: the original observations_df plus the
+# culmination time of the observed pass
+OBSERVATION_COLUMNS = ['pass_id', 'max_alt_time', 'observation_time', 'weather', 'successful', 'notes',
+                       'actual_altitude']
+# An observation belongs to the pass culminating within this of its recorded
+# culmination time (re-predictions from newer TLEs shift passes by seconds)
+PASS_MATCH_TOLERANCE = timedelta(minutes=10)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    site TEXT NOT NULL DEFAULT '',
+    pass_id INTEGER,
+    observation_time TEXT NOT NULL,
+    observer TEXT NOT NULL DEFAULT '',
+    max_alt_time TEXT,
+    weather TEXT,
+    successful INTEGER,
+    notes TEXT,
+    actual_altitude REAL,
+    predicted_altitude REAL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_site_pass ON observations (site, pass_id);
+CREATE INDEX IF NOT EXISTS idx_observations_site_time ON observations (site, observation_time);
+CREATE INDEX IF NOT EXISTS idx_observations_time ON observations (observation_time);
+CREATE INDEX IF NOT EXISTS idx_observations_observer_site ON observations (observer, site, observation_time);
+CREATE TABLE IF NOT EXISTS observation_summary (
+    observer TEXT NOT NULL,
+    site TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    successful INTEGER NOT NULL,
+    error_count INTEGER NOT NULL,
+    error_sum REAL NOT NULL,
+    error_sumsq REAL NOT NULL,
+    PRIMARY KEY (observer, site)
+);
+CREATE TABLE IF NOT EXISTS weather_summary (
+    observer TEXT NOT NULL,
+    site TEXT NOT NULL,
+    weather TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    successful INTEGER NOT NULL,
+    PRIMARY KEY (observer, site, weather)
+);
+"""
+
+_UPDATE_SUMMARY = """
+INSERT INTO observation_summary (observer, site, total, successful, error_count, error_sum, error_sumsq)
+VALUES (?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT (observer, site) DO UPDATE SET
+    total = total + 1,
+    successful = successful + excluded.successful,
+    error_count = error_count + excluded.error_count,
+    error_sum = error_sum + excluded.error_sum,
+    error_sumsq = error_sumsq + excluded.error_sumsq
+"""
+
+_UPDATE_WEATHER = """
+INSERT INTO weather_summary (observer, site, weather, total, successful) VALUES (?, ?, ?, 1, ?)
+ON CONFLICT (observer, site, weather) DO UPDATE SET
+    total = total + 1,
+    successful = successful + excluded.successful
+"""
+
+
+def site_key(latitude, longitude, elevation=None):
+    """Identify an observing site by its coordinates (4 decimals, ~11 m) and elevation (whole metres)."""
+    key = f"{float(latitude):.4f},{float(longitude):.4f}"
+    return key if elevation is None else f"{key},{float(elevation):.0f}"
+
+
+def _optional_float(value):
+    return None if value is None or pd.isna(value) else float(value)
+
+
+def _format_time(value):
+    # ISO text sorts chronologically, so range queries can use the index
+    return pd.Timestamp(value).strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def match_passes(observations, passes, tolerance=PASS_MATCH_TOLERANCE):
+    """
+    Attach the pass_ids of the current `passes` to `observations`.
+
+    Each observation gets the pass_id of the pass in `passes` whose
+    culmination is nearest its max_alt_time, or <NA> when none culminates
+    within `tolerance` (e.g. an expired pass, or an observation logged
+    without a culmination time). The stored pass_id of another session is
+    never used. Returns a copy; row order is kept.
+    """
+    matched = observations.copy()
+    matched['pass_id'] = pd.array([pd.NA] * len(matched), dtype='Int64')
+    known = matched['max_alt_time'].notna()
+    if not known.any() or passes.empty:
+        return matched
+
+    reference = passes[['max_alt_time', 'pass_id']].sort_values('max_alt_time', kind='stable')
+    logged = matched.loc[known, ['max_alt_time']].astype(reference['max_alt_time'].dtype)
+    logged = logged.assign(row=logged.index).sort_values('max_alt_time', kind='stable')
+    nearest = pd.merge_asof(logged, reference, on='max_alt_time', direction='nearest',
+                            tolerance=pd.Timedelta(tolerance))
+    matched.loc[nearest['row'].to_numpy(), 'pass_id'] = nearest['pass_id'].astype('Int64').to_numpy()
+    return matched
+
+
+class ObservationStore:
+    """
+    Append-only observation log backed by SQLite.
+
+    One connection is shared by all threads of the process and guarded by a
+    lock; the database runs in WAL mode so other processes can read while
+    observations are written.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._migrate()
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        # Databases written before the summary tables existed start with empty summaries
+        if self.count() and not self._conn.execute("SELECT COUNT(*) FROM observation_summary").fetchone()[0]:
+            self.rebuild_summaries()
+
+    def _migrate(self):
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(observations)")]
+        if not columns:
+            return
+        if 'predicted_altitude' not in columns:
+            self._conn.execute("ALTER TABLE observations ADD COLUMN predicted_altitude REAL")
+        # Older rows keep an empty observer and no culmination time
+        if 'observer' not in columns:
+            self._conn.execute("ALTER TABLE observations ADD COLUMN observer TEXT NOT NULL DEFAULT ''")
+        if 'max_alt_time' not in columns:
+            self._conn.execute("ALTER TABLE observations ADD COLUMN max_alt_time TEXT")
+        # Summaries kept per site only are dropped and rebuilt per observer and site
+        for table in ('observation_summary', 'weather_summary'):
+            summary_columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if summary_columns and 'observer' not in summary_columns:
+                self._conn.execute(f"DROP TABLE {table}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def append(self, pass_id, weather, successful, notes="", actual_altitude=None,
+               site='', observation_time=None, predicted_altitude=None, observer='', max_alt_time=None):
+        """
+        Log one observation and return its row id.
+
+        `max_alt_time` is the predicted culmination time of the pass (naive
+        UTC) and identifies it across sessions; `pass_id` is only kept for
+        reference. `observer` names the log the observation belongs to.
+        `predicted_altitude` is the predicted max altitude of the pass; when
+        both it and `actual_altitude` are given, the difference feeds the
+        altitude error statistics.
+        """
+        actual = _optional_float(actual_altitude)
+        predicted = _optional_float(predicted_altitude)
+        error = actual - predicted if actual is not None and predicted is not None else None
+        successful = int(bool(successful))
+
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO observations (site, pass_id, observation_time, weather, successful, notes, "
+                "actual_altitude, predicted_altitude, observer, max_alt_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (site, None if pass_id is None else int(pass_id),
+                 _format_time(observation_time or datetime.now()), weather, successful,
+                 notes or "", actual, predicted, observer,
+                 None if max_alt_time is None or pd.isna(max_alt_time) else _format_time(max_alt_time)),
+            )
+            self._update_summaries(observer, site, weather, successful, error)
+            return cursor.lastrowid
+
+    def _update_summaries(self, observer, site, weather, successful, error):
+        self._conn.execute(_UPDATE_SUMMARY, (observer, site, successful, int(error is not None),
+                                             error or 0.0, (error or 0.0) ** 2))
+        if weather is not None:
+            self._conn.execute(_UPDATE_WEATHER, (observer, site, weather, successful))
+
+    def rebuild_summaries(self):
+        """Recompute the summary tables from the full log (only needed after migrations)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM observation_summary")
+            self._conn.execute("DELETE FROM weather_summary")
+            rows = self._conn.execute(
+                "SELECT observer, site, weather, successful, actual_altitude - predicted_altitude FROM observations")
+            for observer, site, weather, successful, error in rows.fetchall():
+                self._update_summaries(observer, site, weather, successful, error)
+
+    def _where(self, site=None, pass_id=None, start=None, end=None, observer=None):
+        clauses, params = [], []
+        if observer is not None:
+            clauses.append("observer = ?")
+            params.append(observer)
+        if site is not None:
+            clauses.append("site = ?")
+            params.append(site)
+        if pass_id is not None:
+            clauses.append("pass_id = ?")
+            params.append(int(pass_id))
+        if start is not None:
+            clauses.append("observation_time >= ?")
+            params.append(_format_time(start))
+        if end is not None:
+            clauses.append("observation_time < ?")
+            params.append(_format_time(end))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, site=None, pass_id=None, start=None, end=None, observer=None):
+        """
+        Return matching observations as a DataFrame in logging order.
+
+        All filters are optional; `start` is inclusive and `end` exclusive.
+        """
+        where, params = self._where(site, pass_id, start, end, observer)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pass_id, max_alt_time, observation_time, weather, successful, notes, actual_altitude, site "
+                "FROM observations" + where + " ORDER BY id", params).fetchall()
+
+        frame = pd.DataFrame(rows, columns=OBSERVATION_COLUMNS + ['site'])
+        frame['pass_id'] = frame['pass_id'].astype('Int64')
+        for column in ('max_alt_time', 'observation_time'):
+            frame[column] = pd.to_datetime(frame[column], format='%Y-%m-%d %H:%M:%S.%f')
+        frame['successful'] = frame['successful'].astype(bool)
+        frame['actual_altitude'] = frame['actual_altitude'].astype(float)
+        return frame
+
+    def count(self, site=None, pass_id=None, start=None, end=None, observer=None):
+        """Number of matching observations."""
+        where, params = self._where(site, pass_id, start, end, observer)
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM observations" + where, params).fetchone()[0]
+
+    def summary(self, site=None, observer=None):
+        """
+        Success and altitude-error statistics, read from the summary table.
+
+        Filtered like query(): pass `observer` to keep other logs out of the
+        statistics. Returns a dict with total, successful, success_rate,
+        error_count, mean_error and std_error (altitude errors are actual
+        minus predicted max altitude, in degrees; None when there are none).
+        """
+        where, params = self._where(site=site, observer=observer)
+        with self._lock:
+            total, successful, n, error_sum, error_sumsq = self._conn.execute(
+                "SELECT COALESCE(SUM(total), 0), COALESCE(SUM(successful), 0), COALESCE(SUM(error_count), 0), "
+                "COALESCE(SUM(error_sum), 0.0), COALESCE(SUM(error_sumsq), 0.0) FROM observation_summary" + where,
+                params).fetchone()
+
+        mean_error = error_sum / n if n else None
+        std_error = math.sqrt(max(error_sumsq / n - mean_error ** 2, 0.0)) if n else None
+        return {
+            'total': total,
+            'successful': successful,
+            'success_rate': successful / total if total else None,
+            'error_count': n,
+            'mean_error': mean_error,
+            'std_error': std_error,
+        }
+
+    def weather_summary(self, site=None, observer=None):
+        """Observation count and success rate per weather condition, indexed by weather."""
+        where, params = self._where(site=site, observer=observer)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT weather, SUM(total), SUM(successful) FROM weather_summary" + where +
+                " GROUP BY weather ORDER BY weather", params).fetchall()
+        frame = pd.DataFrame(rows, columns=['weather', 'count', 'successful']).set_index('weather')
+        frame['success_rate'] = frame['successful'] / frame['count']
+        return frame[['success_rate', 'count']]
+
+    @property
+    def revision(self):
+        """Id of the newest observation; changes whenever something is appended."""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM observations").fetchone()[0]
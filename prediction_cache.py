@@ -0,0 +1,177 @@
+"""
+ISS Pass Predictor - memoized prediction results.
+A bounded, disk-backed LRU cache for pass tables keyed by TLE epoch, rounded
+observer coordinates, prediction window and altitude threshold. One instance
+is shared by every session, and entries survive restarts.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from tle_cache import tle_epoch, tle_norad_id
+
+DEFAULT_CACHE_DIR = os.environ.get('ISS_PREDICTION_CACHE_DIR', '.prediction_cache')
+DEFAULT_MAX_ENTRIES = 256
+# Entries computed from elements older than this are evicted (or never stored)
+DEFAULT_MAX_TLE_AGE = timedelta(days=7)
+# Window starts are rounded down to this, so nearby clicks share an entry
+WINDOW_RESOLUTION = timedelta(minutes=15)
+# 4 decimals is ~11 m, the same step as the sidebar inputs
+COORD_DECIMALS = 4
+
+
+def window_start(now, resolution=WINDOW_RESOLUTION):
+    """Round a naive UTC datetime down to the cache's window resolution."""
+    seconds = resolution.total_seconds()
+    floored = (now - datetime(1970, 1, 1)).total_seconds() // seconds * seconds
+    return datetime(1970, 1, 1) + timedelta(seconds=floored)
+
+
+def prediction_key(tle_lines, latitude, longitude, elevation, start, days, min_altitude):
+    """Build the cache key for one prediction request."""
+    return (
+        tle_norad_id(tle_lines[1]),
+        tle_epoch(tle_lines[1]).isoformat(),
+        round(float(latitude), COORD_DECIMALS),
+        round(float(longitude), COORD_DECIMALS),
+        round(float(elevation)),
+        start.isoformat(),
+        float(days),
+        float(min_altitude),
+    )
+
+
+def _key_hash(key):
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """
+    LRU cache of pass tables, persisted as one pickle file per entry.
+
+    Recency is tracked in memory and mirrored to file modification times, so
+    a new process starts with the same LRU order. Entries are evicted when
+    there are more than `max_entries`, when their TLE epoch is older than
+    `max_tle_age`, or when a newer epoch for the same satellite is stored.
+    Tables computed from elements already older than `max_tle_age` (such as
+    the fallback TLE) are not stored at all.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_tle_age=DEFAULT_MAX_TLE_AGE):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_tle_age = max_tle_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key hash -> key tuple, least recently used first
+        self._index = OrderedDict()
+        # key hash -> pass table, for entries already read in this process
+        self._memory = {}
+        self._load_index()
+
+    def _path(self, key_hash):
+        return os.path.join(self.cache_dir, f"{key_hash}.pkl")
+
+    def _load_index(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.pkl'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                with open(path, 'rb') as f:
+                    key = pickle.load(f)['key']
+                entries.append((os.path.getmtime(path), _key_hash(key), key))
+            except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+                continue
+        for _, key_hash, key in sorted(entries):
+            self._index[key_hash] = key
+
+    def _remove(self, key_hash):
+        self._index.pop(key_hash, None)
+        self._memory.pop(key_hash, None)
+        try:
+            os.remove(self._path(key_hash))
+        except OSError:
+            pass
+
+    def get(self, key):
+        """Return a copy of the cached pass table for `key`, or None."""
+        key_hash = _key_hash(key)
+        with self._lock:
+            if key_hash not in self._index:
+                self.misses += 1
+                return None
+            passes = self._memory.get(key_hash)
+            if passes is None:
+                try:
+                    with open(self._path(key_hash), 'rb') as f:
+                        passes = pickle.load(f)['passes']
+                except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+                    self._remove(key_hash)
+                    self.misses += 1
+                    return None
+                self._memory[key_hash] = passes
+            self._index.move_to_end(key_hash)
+            try:
+                os.utime(self._path(key_hash))
+            except OSError:
+                pass
+            self.hits += 1
+            return passes.copy()
+
+    def _is_stale(self, key, now=None):
+        return (now or datetime.now(timezone.utc)) - datetime.fromisoformat(key[1]) > self.max_tle_age
+
+    def put(self, key, passes):
+        """Store a pass table under `key` and apply the eviction rules (stale keys are skipped)."""
+        if self._is_stale(key):
+            return
+        key_hash = _key_hash(key)
+        passes = passes.copy()
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key_hash)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'key': key, 'passes': passes}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._index[key_hash] = key
+            self._index.move_to_end(key_hash)
+            self._memory[key_hash] = passes
+            self._evict(newest_key=key)
+
+    def _evict(self, newest_key=None, now=None):
+        now = now or datetime.now(timezone.utc)
+        for key_hash, key in list(self._index.items()):
+            norad_id, epoch = key[0], datetime.fromisoformat(key[1])
+            superseded = (newest_key is not None and norad_id == newest_key[0]
+                          and epoch < datetime.fromisoformat(newest_key[1]))
+            if superseded or self._is_stale(key, now):
+                self._remove(key_hash)
+        while len(self._index) > self.max_entries:
+            self._remove(next(iter(self._index)))
+
+    def evict_stale(self, now=None):
+        """Drop entries whose TLE epoch is older than max_tle_age."""
+        with self._lock:
+            self._evict(now=now)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached pass table for `key`, calling `compute()` and storing it on a miss."""
+        passes = self.get(key)
+        if passes is None:
+            passes = compute()
+            self.put(key, passes)
+        return passes
+
+    def __len__(self):
+        return len(self._index)
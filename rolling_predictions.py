@@ -0,0 +1,113 @@
+"""
+ISS Pass Predictor - incremental rolling-horizon predictions.
+Keeps the passes already computed for one site and, on refresh, only drops the
+passes that have started and searches the newly exposed end of the horizon.
+A full recomputation happens only when the TLE epoch changes, and pass_ids
+stay stable for the session. Logged observations are matched to passes by
+culmination time instead (observation_store.match_passes), since pass_ids
+restart in every session.
+"""
+
+from datetime import timedelta
+
+import pandas as pd
+
+from iss_predictor import PASS_COLUMNS
+
+# The new slice starts this far before the old horizon so a pass that was cut
+# off by the old window end is found whole
+DEFAULT_OVERLAP = timedelta(minutes=30)
+# Passes whose culminations are closer than this are the same pass
+DEFAULT_MATCH_TOLERANCE = timedelta(minutes=10)
+
+
+class RollingPredictions:
+    """
+    Rolling pass predictions for one observer site and altitude threshold.
+
+    `refresh()` takes a `search(start, end)` callable that returns a pass
+    table (PASS_COLUMNS) for a window given as naive UTC datetimes. It is only
+    asked for the slice of the horizon that has not been searched yet.
+    """
+
+    def __init__(self, overlap=DEFAULT_OVERLAP, match_tolerance=DEFAULT_MATCH_TOLERANCE):
+        self.overlap = overlap
+        self.match_tolerance = match_tolerance
+        self.tle_epoch = None
+        self.passes = None
+        self.horizon_end = None
+        self.next_pass_id = 1
+        # How the last refresh was served: 'full', 'incremental' or 'unchanged'
+        self.last_refresh = None
+
+    def _assign_new_ids(self, table):
+        table = table.reset_index(drop=True)
+        table.insert(0, 'pass_id', range(self.next_pass_id, self.next_pass_id + len(table)))
+        self.next_pass_id += len(table)
+        return table
+
+    def _carry_over_ids(self, table):
+        """Give recomputed passes the pass_id of the previous pass they match, if any."""
+        table = table.sort_values('max_alt_time').reset_index(drop=True)
+        if self.passes is None or self.passes.empty or table.empty:
+            return self._assign_new_ids(table)
+
+        previous = self.passes[['max_alt_time', 'pass_id']].sort_values('max_alt_time')
+        matched = pd.merge_asof(table[['max_alt_time']], previous, on='max_alt_time',
+                                direction='nearest', tolerance=pd.Timedelta(self.match_tolerance))
+        pass_id = matched['pass_id'].astype('Int64')
+        unmatched = pass_id.isna()
+        pass_id[unmatched] = range(self.next_pass_id, self.next_pass_id + int(unmatched.sum()))
+        self.next_pass_id += int(unmatched.sum())
+        table.insert(0, 'pass_id', pass_id.astype(int).to_numpy())
+        return table
+
+    def refresh(self, now, tle_epoch, search, days=7, full_search=None):
+        """
+        Bring the predictions up to date for the window [now, now + days].
+
+        Parameters:
+        -----------
+        now : datetime
+            Current time, naive UTC
+        tle_epoch : datetime
+            Epoch of the TLE the predictions are computed from
+        search : callable
+            search(start, end) -> pass table for that window
+        days : float, optional
+            Prediction horizon in days (default: 7)
+        full_search : callable, optional
+            Used instead of `search` for full recomputations, e.g. a cached
+            version of the same search
+
+        Returns:
+        --------
+        pandas.DataFrame
+            pass_id followed by the PASS_COLUMNS, sorted by rise_time
+        """
+        end = now + timedelta(days=days)
+
+        if self.passes is None or tle_epoch != self.tle_epoch:
+            table = (full_search or search)(now, end)
+            self.passes = self._carry_over_ids(table[table['rise_time'] >= now])
+            self.tle_epoch = tle_epoch
+            self.horizon_end = end
+            self.last_refresh = 'full'
+            return self.passes.copy()
+
+        # Drop passes that have already started, and any beyond a shortened horizon
+        passes = self.passes[(self.passes['rise_time'] >= now) & (self.passes['set_time'] <= end)]
+        self.last_refresh = 'unchanged'
+
+        if end > self.horizon_end:
+            new = search(self.horizon_end - self.overlap, end)
+            if not self.passes.empty:
+                last_max = self.passes['max_alt_time'].max()
+                new = new[new['max_alt_time'] > last_max + pd.Timedelta(self.match_tolerance)]
+            new = self._assign_new_ids(new[new['rise_time'] >= now])
+            passes = pd.concat([passes, new], ignore_index=True) if not new.empty else passes
+            self.last_refresh = 'incremental'
+
+        self.passes = passes.sort_values('rise_time').reset_index(drop=True)[['pass_id'] + PASS_COLUMNS]
+        self.horizon_end = end
+        return self.passes.copy()
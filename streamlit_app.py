@@ -3,28 +3,30 @@ ISS Pass Predictor & Logger - Streamlit Web App
 A simple web interface for predicting ISS passes and logging observations.
 """
 
+import secrets
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import requests
-import time # Added for retry mechanism
-from requests.exceptions import RequestException # Specific exception for robustness
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import warnings
 warnings.filterwarnings('ignore')
 
-# Skyfield imports
-from skyfield.api import load, EarthSatellite, Topos
+# Skyfield and matplotlib are imported where they are first needed, so the
+# landing page renders without loading them
+
+# Pass prediction engine and persistent TLE store
+from iss_predictor import add_visibility, find_pass_table, get_timescale, sample_pass_paths
+from tle_cache import TLECache, tle_epoch
+from prediction_cache import PredictionCache, prediction_key, window_start
+from rolling_predictions import RollingPredictions
+from observation_store import ObservationStore, match_passes, site_key
+from instrumentation import finish_trace, metrics, span, start_trace
+from data_export import EXPORT_FORMATS, csv_bytes, parquet_bytes
+from charts import daily_pass_counts, daily_passes_png, success_pie_png
+from iss_pipeline import download_tle_data as pipeline_download_tle_data, get_ephemeris
 
-# --- HARDCODED FALLBACK TLE ---
-# This data ensures the app works even if Celestrak is completely down.
-# This TLE is for ISS (ZARYA) - NORAD ID 25544
-FALLBACK_TLE = [
-    "ISS (ZARYA)",
-    "1 25544U 98067A   25301.12345678  .00007890  00000-0  14567-3 0  9997",
-    "2 25544  51.6410 215.3456 0005789 290.7890 120.4567 15.49200000418579"
-]
+# Every script run is traced; stages below are timed with span()
+run_trace = start_trace('streamlit_run')
 
 # Set page config
 st.set_page_config(
@@ -39,153 +41,82 @@ st.markdown("Predict when the International Space Station will be visible from y
 
 # --- Initial Setup and Caching ---
 
-# FIX: Initialize non-serializable Skyfield objects directly in the script's global scope.
-try:
-    # Load Skyfield timescale
-    ts = load.timescale()
-    # Load ephemeris (downloads de421.bsp if not present)
-    eph = load('de421.bsp')
-except Exception as e:
-    st.error(f"Failed to load Skyfield data: {e}. Please check your Skyfield installation.")
-    ts = None
-    eph = None
+@st.cache_resource(show_spinner="Loading Skyfield timescale and ephemeris...")
+def get_skyfield_data():
+    """Skyfield timescale and DE421 ephemeris, loaded once per process on first use."""
+    # Downloads de421.bsp (~10MB) if not present
+    return get_timescale(), get_ephemeris()
+
+
+def load_skyfield_data():
+    """(ts, eph), or (None, None) with an error message if they could not be loaded."""
+    try:
+        with span('skyfield_load'):
+            return get_skyfield_data()
+    except Exception as e:
+        # Not cached, so the next click tries again
+        st.error(f"Failed to load Skyfield data: {e}. Please check your Skyfield installation.")
+        return None, None
+
+
+@st.cache_resource
+def get_prediction_cache():
+    """Pass-table cache shared by every session in this process (and persisted to disk)."""
+    return PredictionCache()
+
+
+@st.cache_resource
+def get_observation_store():
+    """Observation store shared by every session (SQLite, persisted across restarts); each visitor sees only their own log."""
+    return ObservationStore()
 
 
 # Initialize session state for persistent data
 if 'predictions_df' not in st.session_state:
     st.session_state.predictions_df = None
-if 'observations_df' not in st.session_state:
-    # Initialize with the correct columns, ready for concatenation
-    st.session_state.observations_df = pd.DataFrame(columns=[
-        'pass_id', 'observation_time', 'weather', 'successful', 'notes', 'actual_altitude'
-    ])
+if 'predictions_version' not in st.session_state:
+    st.session_state.predictions_version = 0
+if 'rolling_predictions' not in st.session_state:
+    # One RollingPredictions per (site, threshold), so refreshes only search the new slice
+    st.session_state.rolling_predictions = {}
 
-@st.cache_data(ttl=3600)  # Cache TLE data for 1 hour
-# Note: max_retries here is now ignored; we use explicit attempt counts below.
-def download_tle_data(max_retries=5, initial_delay=3, timeout=20): 
-    """
-    Download current ISS TLE data from Celestrak using a primary URL, and falling
-    back to a secondary URL if the first fails. Implements exponential backoff 
-    for maximum network resilience. If all attempts fail, returns a hardcoded TLE.
-    """
-    
-    def fetch_tle_data_with_retries(url, url_name, max_attempts):
-        """Helper function to perform fetching and retries, up to max_attempts total."""
-        for attempt in range(max_attempts):
-            try:
-                #st.info(f"Attempting download from {url_name} (Attempt {attempt + 1}/{max_attempts})...")
-                response = requests.get(url, timeout=timeout)
-                response.raise_for_status()
-                return response.text.strip().split('\n')
-            except RequestException as e:
-                if attempt < max_attempts - 1:
-                    delay = initial_delay * (2 ** attempt)
-                    st.warning(f"Download failed from {url_name} (Attempt {attempt + 1}/{max_attempts}). Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    st.error(f"Failed to download TLE data from {url_name} after {max_attempts} attempts.")
-                    return None
-            except Exception as e:
-                st.error(f"Error processing TLE data from {url_name}: {e}")
-                return None
-        return None
+# A run that ended in an exception never reached finish_trace(); record it now,
+# timed up to its last finished stage, so it still reaches the metrics and logs
+interrupted_trace = st.session_state.get('run_trace')
+if interrupted_trace is not None and interrupted_trace.seconds is None:
+    interrupted_trace.attributes['interrupted'] = True
+    finish_trace(interrupted_trace, seconds=interrupted_trace.last_span_end())
+st.session_state.run_trace = run_trace
 
-    # --- 1. Primary Attempt: Specific ISS TLE ---
-    primary_url = "https://celestrak.org/NORAD/elements/gp.php?CATNR=25544"
-    # User requested 4-6 total attempts, using 3 for primary.
-    tle_lines = fetch_tle_data_with_retries(primary_url, "Primary (CATNR=25544)", 3) 
-    
-    if tle_lines:
-        # Check if the primary download resulted in the 3 required lines
-        if len(tle_lines) >= 3:
-             # The primary URL is already formatted correctly, just need to confirm content
-             if 'ISS (ZARYA)' in tle_lines[0] or '25544' in tle_lines[1] and '25544' in tle_lines[2]:
-                st.success("✅ TLE data successfully retrieved from primary source.")
-                return tle_lines[:3]
-        
-        st.warning("Primary TLE source was accessed but did not contain expected ISS data. Falling back...")
+# On-disk TLE store shared by every session and worker process
+tle_cache = TLECache()
 
-    # --- 2. Secondary Attempt: General Stations TLE file ---
-    secondary_url = "https://celestrak.org/NORAD/elements/stations.txt"
-    # Using 2 for secondary, for a total of 5 attempts (3 + 2).
-    all_stations_tle = fetch_tle_data_with_retries(secondary_url, "Secondary (stations.txt)", 2)
+def _notify_streamlit(level, message):
+    """Show pipeline progress messages (success/warning/error) in the app."""
+    getattr(st, level)(message)
 
-    if all_stations_tle:
-        # Logic to parse the ISS TLE (NORAD ID 25544) from the large file (3-line format)
-        for i, line in enumerate(all_stations_tle):
-            # Check for the name line which contains 'ISS (ZARYA)'
-            if 'ISS (ZARYA)' in line:
-                if i + 2 < len(all_stations_tle):
-                    # Found the name line, return it and the next two lines (TLE lines 1 and 2)
-                    st.success("✅ TLE data successfully retrieved from secondary source.")
-                    return all_stations_tle[i:i+3]
-        
-        st.error("Secondary TLE source downloaded, but ISS data (25544) was not found within the file.")
-        return None
+@st.cache_data(ttl=3600)  # Cache TLE data for 1 hour
+def download_tle_data(initial_delay=3, timeout=20):
+    """
+    Current ISS TLE lines, via the headless pipeline's iss_pipeline.download_tle_data().
 
-    # --- 3. Final Fallback: Use Hardcoded TLE ---
-    st.error("🚨 Network error: Both online TLE sources failed after multiple retries.")
-    st.warning("🚀 **Using built-in fallback TLE data.** Predictions will still work, but may be slightly less accurate if the data is old.")
-    return FALLBACK_TLE
+    Elements already in the on-disk TLE cache are returned without touching the
+    network; stale ones are revalidated in the background. Otherwise Celestrak's
+    single-object query and its stations file are requested at the same time
+    (hedged, each retried with exponential backoff) and the first valid TLE set
+    wins. If both fail, an outdated cache entry or the hardcoded TLE is returned.
+    """
+    # User requested 4-6 total attempts: 3 for primary, 2 for secondary
+    return pipeline_download_tle_data(cache=tle_cache, notify=_notify_streamlit,
+                                      primary_attempts=3, secondary_attempts=2,
+                                      initial_delay=initial_delay, timeout=timeout)
 
 def calculate_visible_passes(satellite, observer_location, start_time, days=7, min_altitude=10.0):
-    """Calculate all visible ISS passes for a specified time period, including rise/set azimuth."""
-    # Ensure ts is available before proceeding
-    if ts is None:
-        return []
-        
-    end_time = start_time + days
-    t, events = satellite.find_events(observer_location, start_time, end_time, altitude_degrees=min_altitude)
-    
-    passes = []
-    i = 0
-    while i < len(events):
-        # A pass is defined by: 0=Rise, 1=Max Alt, 2=Set
-        # Check if the sequence is (Rise, Max, Set)
-        if i + 2 < len(events) and events[i] == 0 and events[i+1] == 1 and events[i+2] == 2:
-            rise_time = t[i]
-            max_alt_time = t[i+1]
-            set_time = t[i+2]
-            
-            duration_minutes = (set_time - rise_time) * 24 * 60
-            
-            difference = satellite - observer_location
-            
-            # Max Altitude and Brightness
-            topocentric_max = difference.at(max_alt_time)
-            alt_max, az_max, distance = topocentric_max.altaz()
-            max_altitude = alt_max.degrees
-            
-            # Rise Azimuth (Horizon to Max Alt)
-            topocentric_rise = difference.at(rise_time)
-            _, rise_az, _ = topocentric_rise.altaz()
-            
-            # Set Azimuth (Max Alt to Horizon)
-            topocentric_set = difference.at(set_time)
-            _, set_az, _ = topocentric_set.altaz()
-            
-            distance_km = distance.km
-            # Simple approximation of visual brightness (magnitude). Lower is brighter.
-            # Using 400km as a reference for roughly 0 magnitude
-            brightness = -2.0 - (400 / distance_km) 
-            
-            pass_info = {
-                'rise_time': rise_time.utc_datetime().replace(tzinfo=None), # Make timezone naive
-                'max_alt_time': max_alt_time.utc_datetime().replace(tzinfo=None), # Make timezone naive
-                'set_time': set_time.utc_datetime().replace(tzinfo=None), # Make timezone naive
-                'max_altitude': round(max_altitude, 2),
-                'rise_azimuth': round(rise_az.degrees, 1),
-                'set_azimuth': round(set_az.degrees, 1),
-                'duration_minutes': round(duration_minutes, 1),
-                'brightness': round(brightness, 2)
-            }
-            
-            passes.append(pass_info)
-            i += 3 # Skip past Rise, Max, Set
-        else:
-            i += 1 # Move to the next event
-    
-    return passes
+    """Calculate all visible ISS passes for a specified time period, including rise/set azimuth.
+
+    Returns a DataFrame (one row per pass) built by the vectorized engine in iss_predictor.
+    """
+    return find_pass_table(satellite, observer_location, start_time, days=days, min_altitude=min_altitude)
 
 # --- Sidebar Configuration ---
 with st.sidebar:
@@ -200,34 +131,84 @@ with st.sidebar:
     days_ahead = st.slider("Days to predict", 1, 14, 7)
     min_altitude = st.slider("Minimum altitude (°)", 0.0, 30.0, 10.0, step=0.5)
     altitude_threshold = st.slider("Filter passes above (°)", 0.0, 90.0, 30.0, step=5.0)
+    visible_only = st.checkbox("Only naked-eye visible passes", value=True,
+                               help="Keep passes where the ISS is sunlit while the sun is at least 6° below your horizon.")
+    show_timings = st.checkbox("Show timing diagnostics", value=False,
+                               help="Per-stage timing of this run: TLE download, satellite setup, pass search and rendering.")
+    native_charts = st.checkbox("Interactive charts", value=False,
+                                help="Draw the passes-per-day chart with Streamlit's built-in charts instead of matplotlib.")
+    
+    st.subheader("Observation Log")
+    # Observations are private to a random log ID that is kept in the page URL
+    default_log = st.query_params.get('log') or secrets.token_urlsafe(9)
+    log_id = st.text_input("Log ID", value=default_log,
+                           help="Only visitors with this ID see its observations. Bookmark the page to come back "
+                                "to your log, or paste an ID to open an existing one.")
+    observer = log_id.strip() or default_log
+    st.query_params['log'] = observer
     
     if st.button("🔄 Calculate Passes", type="primary"):
+        run_trace.attributes['calculate'] = True
+        ts, eph = load_skyfield_data()
         if ts is None or eph is None:
             st.error("Cannot calculate passes because Skyfield data failed to load.")
         else:
+            from skyfield.api import EarthSatellite, Topos
+            
             with st.spinner("Downloading TLE data and calculating passes..."):
                 
                 # Download TLE
-                tle_data = download_tle_data()
+                with span('download_tle'):
+                    tle_data = download_tle_data()
                 if tle_data:
-                    # EarthSatellite initialization
-                    satellite = EarthSatellite(tle_data[1], tle_data[2], tle_data[0], ts)
-                    observer = Topos(latitude, longitude, elevation_m=elevation)
+                    now_utc = ts.now().utc_datetime().replace(tzinfo=None)
                     
-                    # Calculate passes
-                    now = ts.now()
-                    all_passes = calculate_visible_passes(satellite, observer, now, days=days_ahead, min_altitude=min_altitude)
+                    def search_passes(start, end):
+                        # EarthSatellite initialization (only needed when something must be searched)
+                        with span('satellite_build'):
+                            satellite = EarthSatellite(tle_data[1], tle_data[2], tle_data[0], ts)
+                            observer_location = Topos(latitude, longitude, elevation_m=elevation)
+                        start_time = ts.from_datetime(start.replace(tzinfo=timezone.utc))
+                        days = (end - start) / timedelta(days=1)
+                        with span('pass_search', days=days):
+                            return calculate_visible_passes(satellite, observer_location, start_time, days=days, min_altitude=min_altitude)
                     
-                    if all_passes:
-                        predictions_df = pd.DataFrame(all_passes)
-                        predictions_df['pass_id'] = range(1, len(predictions_df) + 1)
-                        # The calculated times in the function are already timezone-naive, 
+                    def cached_full_search(start, end):
+                        # Round the window start so repeated clicks share one cache entry
+                        rounded_start = window_start(start)
+                        cache_key = prediction_key(tle_data, latitude, longitude, elevation, rounded_start, days_ahead, min_altitude)
+                        return get_prediction_cache().get_or_compute(
+                            cache_key, lambda: search_passes(rounded_start, rounded_start + timedelta(days=days_ahead)))
+                    
+                    # Calculate passes: a full (cached) search for a new site or TLE epoch,
+                    # otherwise only the newly exposed end of the horizon is searched
+                    rolling = st.session_state.rolling_predictions.setdefault(
+                        (latitude, longitude, elevation, min_altitude), RollingPredictions())
+                    with span('predict'):
+                        predictions_df = rolling.refresh(now_utc, tle_epoch(tle_data[1]), search_passes,
+                                                         days=days_ahead, full_search=cached_full_search)
+                    run_trace.attributes['refresh'] = rolling.last_refresh
+                    
+                    # Visibility: the ISS must be sunlit while the observer is in darkness
+                    if visible_only and not predictions_df.empty:
+                        with span('visibility'):
+                            satellite = EarthSatellite(tle_data[1], tle_data[2], tle_data[0], ts)
+                            observer_location = Topos(latitude, longitude, elevation_m=elevation)
+                            predictions_df = add_visibility(predictions_df, satellite, observer_location, eph, ts)
+                    
+                    if not predictions_df.empty:
+                        # pass_ids come from RollingPredictions and stay stable across refreshes.
+                        # The engine already returns timezone-naive datetime64 columns,
                         # but we ensure dtypes are consistent across Streamlit runs.
-                        predictions_df['rise_time'] = pd.to_datetime(predictions_df['rise_time'])
-                        predictions_df['max_alt_time'] = pd.to_datetime(predictions_df['max_alt_time'])
-                        predictions_df['set_time'] = pd.to_datetime(predictions_df['set_time'])
+                        with span('frame_build'):
+                            predictions_df['rise_time'] = pd.to_datetime(predictions_df['rise_time'])
+                            predictions_df['max_alt_time'] = pd.to_datetime(predictions_df['max_alt_time'])
+                            predictions_df['set_time'] = pd.to_datetime(predictions_df['set_time'])
                         
                         st.session_state.predictions_df = predictions_df
+                        st.session_state.tle_data = tle_data
+                        # Bump the version so cached merges with observations are rebuilt
+                        st.session_state.predictions_version += 1
                         st.success(f"✅ Found {len(predictions_df)} passes!")
                     else:
                         st.warning("No passes found for the specified criteria.")
@@ -236,10 +217,52 @@ with st.sidebar:
 if st.session_state.predictions_df is not None:
     predictions_df = st.session_state.predictions_df
     
+    # This log's observations at this site; the store is only re-queried after something new was logged
+    observation_store = get_observation_store()
+    current_site = site_key(latitude, longitude, elevation)
+    observations_key = (observer, current_site, observation_store.revision)
+    if st.session_state.get('observations_key') != observations_key:
+        st.session_state.observations_df = observation_store.query(site=current_site, observer=observer)
+        st.session_state.observations_key = observations_key
+    
+    # Observations matched to this session's passes by culmination time (pass_ids
+    # restart in every session) and merged with the predictions. Built once per
+    # change and shared by the log, the analytics view and the exports
+    merged_key = (st.session_state.predictions_version, observations_key)
+    if st.session_state.get('merged_key') != merged_key:
+        matched = match_passes(st.session_state.observations_df, predictions_df)
+        st.session_state.matched_observations_df = matched
+        st.session_state.merged_df = pd.merge(predictions_df, matched.drop(columns=['site', 'max_alt_time']),
+                                              on='pass_id', how='left', suffixes=('_pred', '_obs'))
+        st.session_state.merged_key = merged_key
+    observations_df = st.session_state.matched_observations_df
+    merged_df = st.session_state.merged_df
+    
     # Location Map Enhancement
     st.subheader("🌍 Observer Location")
-    location_data = pd.DataFrame({'lat': [latitude], 'lon': [longitude]})
-    st.map(location_data, zoom=9)
+    location_data = pd.DataFrame({'lat': [latitude], 'lon': [longitude], 'color': ['#FF5722']})
+    tle_data = st.session_state.get('tle_data')
+    # Passes that already rose are behind us; the map follows the next one
+    now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+    next_pass = predictions_df[predictions_df['rise_time'] >= now_utc].iloc[:1]
+    if tle_data and not next_pass.empty:
+        # Ground track of the next pass, sampled every 10 s; computed once per prediction run and pass
+        ground_track_key = (st.session_state.predictions_version, int(next_pass['pass_id'].iloc[0]))
+        if st.session_state.get('ground_track_key') != ground_track_key:
+            with span('ground_track'):
+                from skyfield.api import EarthSatellite
+                
+                ts = get_timescale()
+                satellite = EarthSatellite(tle_data[1], tle_data[2], tle_data[0], ts)
+                paths = sample_pass_paths(next_pass, satellite, (latitude, longitude, elevation),
+                                          step_seconds=10.0, ts=ts)
+                st.session_state.ground_track = pd.DataFrame(
+                    {'lat': paths.latitude, 'lon': paths.longitude, 'color': '#1E88E5'})
+            st.session_state.ground_track_key = ground_track_key
+        st.caption(f"Blue: ground track of the next pass (Pass {ground_track_key[1]})")
+        st.map(pd.concat([location_data, st.session_state.ground_track], ignore_index=True), color='color', zoom=3)
+    else:
+        st.map(location_data, color='color', zoom=9)
     
     # Tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Predictions", "⭐ Best Passes", "📝 Log Observation", "📈 Analytics"])
@@ -252,30 +275,36 @@ if st.session_state.predictions_df is not None:
             'pass_id', 'rise_time', 'max_alt_time', 'max_altitude', 
             'rise_azimuth', 'set_azimuth', 'duration_minutes', 'brightness'
         ]
+        # Visible segment columns are only present when the visibility filter ran
+        display_cols += [c for c in ['visible_start', 'visible_end', 'visible_minutes'] if c in predictions_df.columns]
         
-        st.dataframe(
-            predictions_df[display_cols].style.format({
-                'max_altitude': '{:.1f}°',
-                'rise_azimuth': '{:.1f}°',
-                'set_azimuth': '{:.1f}°',
-                'duration_minutes': '{:.1f} min',
-                'brightness': '{:.2f}'
-            }),
-            use_container_width=True,
-            height=400
-        )
+        with span('render_predictions', rows=len(predictions_df)):
+            st.dataframe(
+                predictions_df[display_cols].style.format({
+                    'max_altitude': '{:.1f}°',
+                    'rise_azimuth': '{:.1f}°',
+                    'set_azimuth': '{:.1f}°',
+                    'duration_minutes': '{:.1f} min',
+                    'brightness': '{:.2f}',
+                    'visible_minutes': '{:.1f} min'
+                }),
+                use_container_width=True,
+                height=400
+            )
         
         # Daily pass frequency
         st.subheader("Passes per Day")
-        daily_passes = predictions_df['rise_time'].dt.date.value_counts().sort_index()
-        fig, ax = plt.subplots(figsize=(10, 4))
-        daily_passes.plot(kind='bar', ax=ax, color='skyblue', edgecolor='black')
-        ax.set_title('ISS Pass Frequency')
-        ax.set_xlabel('Date')
-        ax.set_ylabel('Number of Passes')
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
+        with span('render_daily_chart'):
+            # Counted once per prediction run; the rendered image is cached by its values
+            if st.session_state.get('daily_passes_version') != st.session_state.predictions_version:
+                st.session_state.daily_passes = daily_pass_counts(predictions_df['rise_time'])
+                st.session_state.daily_passes_version = st.session_state.predictions_version
+            daily_passes = st.session_state.daily_passes
+            if native_charts:
+                st.bar_chart(daily_passes.rename_axis('Date').rename('Number of Passes'),
+                             x_label='Date', y_label='Number of Passes')
+            else:
+                st.image(daily_passes_png(daily_passes), width="stretch")
     
     # --- Tab 2: Best Passes ---
     with tab2:
@@ -284,16 +313,18 @@ if st.session_state.predictions_df is not None:
         
         if len(good_passes) > 0:
             st.metric("Good Passes Found", len(good_passes))
-            st.dataframe(
-                good_passes[display_cols].style.format({
-                    'max_altitude': '{:.1f}°',
-                    'rise_azimuth': '{:.1f}°',
-                    'set_azimuth': '{:.1f}°',
-                    'duration_minutes': '{:.1f} min',
-                    'brightness': '{:.2f}'
-                }),
-                use_container_width=True
-            )
+            with span('render_best_passes', rows=len(good_passes)):
+                st.dataframe(
+                    good_passes[display_cols].style.format({
+                        'max_altitude': '{:.1f}°',
+                        'rise_azimuth': '{:.1f}°',
+                        'set_azimuth': '{:.1f}°',
+                        'duration_minutes': '{:.1f} min',
+                        'brightness': '{:.2f}',
+                        'visible_minutes': '{:.1f} min'
+                    }),
+                    use_container_width=True
+                )
         else:
             st.info(f"No passes found above {altitude_threshold}°")
     
@@ -327,135 +358,126 @@ if st.session_state.predictions_df is not None:
                 notes = st.text_area("Notes", height=100, key=f"notes_input_{selected_pass_id}")
             
             if st.button("💾 Save Observation"):
-                observation = {
-                    'pass_id': selected_pass_id, # Use the extracted ID
-                    'observation_time': datetime.now(),
-                    'weather': weather,
-                    'successful': successful,
-                    'notes': notes if notes else "",
-                    'actual_altitude': actual_altitude if actual_altitude else np.nan
-                }
-                
-                # Use pd.concat to append the new observation
-                new_obs_df = pd.DataFrame([observation])
-                st.session_state.observations_df = pd.concat([st.session_state.observations_df, new_obs_df], ignore_index=True)
+                selected_pass = predictions_df.loc[predictions_df['pass_id'] == selected_pass_id].iloc[0]
+                # Append the new observation to the store (a single indexed INSERT)
+                observation_store.append(
+                    pass_id=selected_pass_id, # Use the extracted ID
+                    weather=weather,
+                    successful=successful,
+                    notes=notes if notes else "",
+                    actual_altitude=actual_altitude if actual_altitude else None,
+                    site=current_site,
+                    observation_time=datetime.now(),
+                    # Recorded so the altitude error statistics can be updated on write
+                    predicted_altitude=selected_pass['max_altitude'],
+                    # Identifies the pass in later sessions, whose pass_ids differ
+                    max_alt_time=selected_pass['max_alt_time'],
+                    observer=observer
+                )
                     
                 st.success("✅ Observation saved!")
-                # Force a re-run to clear the form visually
+                # Force a re-run to clear the form visually; st.rerun() ends this run
+                # before the end of the script, so its trace is finished here
+                finish_trace(run_trace)
                 st.rerun() 
         
         # Show existing observations
-        if not st.session_state.observations_df.empty:
+        if not observations_df.empty:
             st.subheader("Your Observations")
-            # Display only relevant columns, excluding potentially empty ones from initialization
-            display_obs_cols = [c for c in ['pass_id', 'observation_time', 'weather', 'successful', 'actual_altitude', 'notes'] if c in st.session_state.observations_df.columns]
-            st.dataframe(st.session_state.observations_df[display_obs_cols], use_container_width=True)
+            st.caption("Pass numbers refer to the current predictions; observations of passes that are no longer predicted have none.")
+            display_obs_cols = ['pass_id', 'max_alt_time', 'observation_time', 'weather', 'successful', 'actual_altitude', 'notes']
+            st.dataframe(observations_df[display_obs_cols], use_container_width=True)
     
     # --- Tab 4: Analytics ---
     with tab4:
         st.header("Analytics")
         
-        if not st.session_state.observations_df.empty:
-            
-            # Data cleaning and merge
-            clean_observations_df = st.session_state.observations_df.copy()
+        # Counts and error statistics of this log at this site, maintained by the store on every write
+        summary = observation_store.summary(site=current_site, observer=observer)
+        total_observed = summary['total']
+        
+        if total_observed > 0:
+            success_count = summary['successful']
+            success_rate = summary['success_rate']
             
-            # Ensure 'pass_id' is integer for reliable merge
-            clean_observations_df['pass_id'] = pd.to_numeric(clean_observations_df['pass_id'], errors='coerce').astype('Int64')
-            predictions_df['pass_id'] = pd.to_numeric(predictions_df['pass_id'], errors='coerce').astype('Int64')
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                st.metric("Success Rate", f"{success_rate:.1%}")
+                st.metric("Total Observations", total_observed)
+                if summary['error_count'] > 0:
+                    st.metric("Mean Altitude Error", f"{summary['mean_error']:+.1f}°",
+                              help=f"Actual minus predicted max altitude over {summary['error_count']} observations (σ = {summary['std_error']:.1f}°)")
             
-            # Merge and filter only observed rows
-            # We use a left merge to combine predictions with corresponding observations
-            merged_df = pd.merge(predictions_df, clean_observations_df, on='pass_id', how='left', suffixes=('_pred', '_obs'))
-            observed_rows = merged_df[merged_df['successful'].notna()]
+            with col2:
+                # Pie chart, re-rendered only when the counts change
+                with span('render_success_pie'):
+                    st.image(success_pie_png(success_count, total_observed), width="stretch")
             
-            total_observed = len(observed_rows)
+            # Weather analysis
+            st.subheader("Success by Weather")
+            weather_analysis = observation_store.weather_summary(site=current_site, observer=observer)
+            weather_analysis.columns = ['Success Rate', 'Count']
+            weather_analysis['Success Rate'] = (weather_analysis['Success Rate'] * 100).map('{:.1f}%'.format)
+            st.dataframe(weather_analysis)
             
-            if total_observed > 0:
-                success_count = observed_rows['successful'].sum()
-                success_rate = success_count / total_observed
-                
-                col1, col2 = st.columns([1, 2])
-                with col1:
-                    st.metric("Success Rate", f"{success_rate:.1%}")
-                    st.metric("Total Observations", total_observed)
-                
-                with col2:
-                    # Pie chart
-                    fig, ax = plt.subplots(figsize=(4, 4))
-                    labels = ['Successful', 'Failed']
-                    sizes = [success_count, total_observed - success_count]
-                    colors = ['#4CAF50', '#FF5722'] 
-                    ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90, wedgeprops={'edgecolor': 'black', 'linewidth': 1})
-                    ax.set_title('Observation Success Rate')
-                    st.pyplot(fig)
-                
-                # Weather analysis
-                if 'weather' in observed_rows.columns:
-                    st.subheader("Success by Weather")
-                    weather_analysis = observed_rows.groupby('weather')['successful'].agg(['mean', 'count'])
-                    weather_analysis.columns = ['Success Rate', 'Count']
-                    weather_analysis['Success Rate'] = (weather_analysis['Success Rate'] * 100).map('{:.1f}%'.format)
-                    st.dataframe(weather_analysis)
-            else:
-                st.info("No completed observations yet. Log some to see analytics!")
+            # Predicted vs actual altitude for the passes in the current predictions
+            compared = merged_df[merged_df['actual_altitude'].notna()]
+            if not compared.empty:
+                st.subheader("Predicted vs Actual Altitude")
+                st.dataframe(compared[['pass_id', 'rise_time', 'max_altitude', 'actual_altitude']], use_container_width=True)
         else:
             st.info("No observations yet. Log some to see analytics!")
         
-        # Export data
+        # Export data: files are generated only when a button is clicked, and the
+        # session's frames are never modified (datetimes are formatted by the writer)
         st.subheader("Export Data")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            # Ensure predictions_df is clean before export
-            predictions_df['rise_time'] = predictions_df['rise_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            predictions_df['max_alt_time'] = predictions_df['max_alt_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            predictions_df['set_time'] = predictions_df['set_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-            csv_predictions = predictions_df.to_csv(index=False).encode('utf-8')
             st.download_button(
                 label="📥 Download Predictions",
-                data=csv_predictions,
+                data=lambda frame=predictions_df: csv_bytes(frame),
                 file_name="iss_predictions.csv",
                 mime="text/csv"
             )
+            st.download_button(
+                label="📥 Predictions (Parquet)",
+                data=lambda frame=predictions_df: parquet_bytes(frame),
+                file_name="iss_predictions.parquet",
+                mime=EXPORT_FORMATS['parquet'][1]
+            )
         
         with col2:
-            if not st.session_state.observations_df.empty:
-                # Format datetime for CSV export
-                obs_df_export = st.session_state.observations_df.copy()
-                # Check if 'observation_time' is a datetime type before applying dt.strftime
-                if pd.api.types.is_datetime64_any_dtype(obs_df_export['observation_time']):
-                     obs_df_export['observation_time'] = obs_df_export['observation_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
-                csv_observations = obs_df_export.to_csv(index=False).encode('utf-8')
+            if not observations_df.empty:
+                obs_df_export = observations_df.drop(columns='site')
                 st.download_button(
                     label="📥 Download Observations",
-                    data=csv_observations,
+                    data=lambda frame=obs_df_export: csv_bytes(frame),
                     file_name="iss_observations.csv",
                     mime="text/csv"
                 )
+                st.download_button(
+                    label="📥 Observations (Parquet)",
+                    data=lambda frame=obs_df_export: parquet_bytes(frame),
+                    file_name="iss_observations.parquet",
+                    mime=EXPORT_FORMATS['parquet'][1]
+                )
         
         with col3:
-            # Re-calculate merged_df if needed for export robustness
-            if not st.session_state.observations_df.empty:
-                merged_df_export = pd.merge(predictions_df, clean_observations_df, on='pass_id', how='left', suffixes=('_pred', '_obs'))
-                
-                # Format dates to strings before export
-                date_cols = ['rise_time_pred', 'max_alt_time_pred', 'set_time_pred', 'observation_time']
-                for col in date_cols:
-                    if col in merged_df_export.columns:
-                        # Attempt to convert datetime columns to string; ignore if already string
-                        try:
-                            merged_df_export[col] = merged_df_export[col].astype(str)
-                        except:
-                            pass # Column is likely already str or non-datetime
-                
-                csv_merged = merged_df_export.to_csv(index=False).encode('utf-8')
+            # Reuse the merged frame built above instead of merging again
+            if not observations_df.empty:
                 st.download_button(
                     label="📥 Download Full Data",
-                    data=csv_merged,
+                    data=lambda frame=merged_df: csv_bytes(frame),
                     file_name="iss_full_data.csv",
                     mime="text/csv"
                 )
+                st.download_button(
+                    label="📥 Full Data (Parquet)",
+                    data=lambda frame=merged_df: parquet_bytes(frame),
+                    file_name="iss_full_data.parquet",
+                    mime=EXPORT_FORMATS['parquet'][1]
+                )
 
 else:
     st.info("<-- Configure your location and click 'Calculate Passes' to get started!")
@@ -486,4 +508,21 @@ else:
     - **90° Azimuth** = East
     - **180° Azimuth** = South
     - **270° Azimuth** = West
-    """)
\ No newline at end of file
+    """)
+
+# --- Timing diagnostics ---
+finish_trace(run_trace)
+if show_timings:
+    with st.sidebar.expander("⏱️ Timing diagnostics", expanded=True):
+        st.caption(f"This run: {run_trace.seconds * 1000:.0f} ms"
+                   + (" (Calculate Passes)" if run_trace.attributes.get('calculate') else ""))
+        timings = run_trace.to_frame()
+        if timings.empty:
+            st.write("No stages were timed in this run.")
+        else:
+            # Indent nested stages under the stage that contains them
+            timings['stage'] = ['· ' * depth + name for depth, name in zip(timings['depth'], timings['stage'])]
+            st.dataframe(timings[['stage', 'ms', 'share']].style.format({'ms': '{:.1f}', 'share': '{:.1%}'}),
+                         hide_index=True, use_container_width=True)
+        st.download_button("📥 Stage metrics (Prometheus)", data=metrics.prometheus_text(),
+                           file_name="iss_metrics.prom", mime="text/plain")
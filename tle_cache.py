@@ -0,0 +1,223 @@
+"""
+ISS Pass Predictor - persistent TLE cache.
+Stores downloaded TLE sets on disk, keyed by NORAD ID, together with the TLE
+epoch and the time they were fetched. Cached elements are served immediately
+and refreshed in the background with conditional HTTP requests, so network
+latency and retry back-off stay off the request path.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.exceptions import RequestException
+
+ISS_NORAD_ID = 25544
+
+# --- HARDCODED FALLBACK TLE ---
+# This data ensures the app works even if Celestrak is completely down.
+# This TLE is for ISS (ZARYA) - NORAD ID 25544
+FALLBACK_TLE = [
+    "ISS (ZARYA)",
+    "1 25544U 98067A   25301.12345678  .00007890  00000-0  14567-3 0  9997",
+    "2 25544  51.6410 215.3456 0005789 290.7890 120.4567 15.49200000418579"
+]
+
+DEFAULT_CACHE_DIR = os.environ.get('ISS_TLE_CACHE_DIR', '.tle_cache')
+CELESTRAK_GP_URL = "https://celestrak.org/NORAD/elements/gp.php?CATNR={norad_id}"
+
+# Refetch after this long (same as the app's in-process TTL)
+DEFAULT_MAX_FETCH_AGE = timedelta(hours=1)
+# Elements older than this are not served without first trying a refresh
+DEFAULT_MAX_EPOCH_AGE = timedelta(days=7)
+
+# NORAD IDs with a background refresh in flight, shared by all caches in the process
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def tle_norad_id(line1):
+    """Return the NORAD catalog number from TLE line 1."""
+    return int(line1[2:7])
+
+
+def tle_epoch(line1):
+    """Return the epoch of a TLE set as a timezone-aware UTC datetime."""
+    field = line1[18:32]
+    year = int(field[:2])
+    # Two-digit years: 57-99 are 1957-1999, 00-56 are 2000-2056
+    year += 1900 if year >= 57 else 2000
+    day_of_year = float(field[2:])
+    return datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(days=day_of_year - 1)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+class CachedTLE:
+    """One cached TLE set and the metadata needed to revalidate it."""
+
+    def __init__(self, lines, fetched_at, etag=None, last_modified=None):
+        self.lines = list(lines)
+        self.fetched_at = fetched_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def norad_id(self):
+        return tle_norad_id(self.lines[1])
+
+    @property
+    def epoch(self):
+        return tle_epoch(self.lines[1])
+
+    def to_dict(self):
+        return {
+            'lines': self.lines,
+            'norad_id': self.norad_id,
+            'epoch': self.epoch.isoformat(),
+            'fetched_at': self.fetched_at.isoformat(),
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            lines=data['lines'],
+            fetched_at=datetime.fromisoformat(data['fetched_at']),
+            etag=data.get('etag'),
+            last_modified=data.get('last_modified'),
+        )
+
+
+class TLECache:
+    """
+    On-disk TLE store keyed by NORAD ID.
+
+    Each entry is a small JSON file in `cache_dir`. An entry is *fresh* while it
+    was fetched less than `max_fetch_age` ago, and *usable* while its epoch is
+    less than `max_epoch_age` old. Usable but stale entries are served as-is
+    while a background thread revalidates them with If-None-Match /
+    If-Modified-Since, so a 304 response costs almost nothing.
+
+    `url_template` is formatted with `norad_id`; point it at a local server to
+    run without Celestrak.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, url_template=CELESTRAK_GP_URL,
+                 max_fetch_age=DEFAULT_MAX_FETCH_AGE, max_epoch_age=DEFAULT_MAX_EPOCH_AGE,
+                 timeout=20):
+        self.cache_dir = cache_dir
+        self.url_template = url_template
+        self.max_fetch_age = max_fetch_age
+        self.max_epoch_age = max_epoch_age
+        self.timeout = timeout
+
+    def _path(self, norad_id):
+        return os.path.join(self.cache_dir, f"{int(norad_id)}.json")
+
+    def lookup(self, norad_id):
+        """Return the cached entry for `norad_id`, or None if there is none."""
+        try:
+            with open(self._path(norad_id), encoding='utf-8') as f:
+                return CachedTLE.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, lines, etag=None, last_modified=None, fetched_at=None):
+        """Write a TLE set to the cache and return its entry."""
+        entry = CachedTLE([line.rstrip() for line in lines[:3]], fetched_at or _utcnow(),
+                          etag=etag, last_modified=last_modified)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(entry.norad_id)
+        # Write then rename, so readers never see a half-written file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+        return entry
+
+    def is_fresh(self, entry, now=None):
+        """True if the entry was fetched recently enough to skip revalidation."""
+        return (now or _utcnow()) - entry.fetched_at < self.max_fetch_age
+
+    def is_usable(self, entry, now=None):
+        """True if the entry's epoch is recent enough to serve without waiting."""
+        return (now or _utcnow()) - entry.epoch < self.max_epoch_age
+
+    def refresh(self, norad_id):
+        """
+        Revalidate one entry against the server with a conditional GET.
+
+        Returns the new (or re-confirmed) entry, or None if the request failed
+        or the response did not contain a TLE set for `norad_id`.
+        """
+        entry = self.lookup(norad_id)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        try:
+            response = requests.get(self.url_template.format(norad_id=norad_id),
+                                    headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                return self.store(entry.lines, etag=entry.etag, last_modified=entry.last_modified)
+            response.raise_for_status()
+        except RequestException:
+            return None
+
+        lines = [line.rstrip() for line in response.text.strip().splitlines()]
+        if (len(lines) < 3 or not lines[1].startswith('1 ') or not lines[2].startswith('2 ')
+                or tle_norad_id(lines[1]) != int(norad_id)):
+            return None
+        return self.store(lines, etag=response.headers.get('ETag'),
+                          last_modified=response.headers.get('Last-Modified'))
+
+    def refresh_in_background(self, norad_id):
+        """
+        Start a daemon thread that refreshes `norad_id`.
+
+        Returns the thread, or None if a refresh for this ID is already running.
+        """
+        with _refreshing_lock:
+            if norad_id in _refreshing:
+                return None
+            _refreshing.add(norad_id)
+
+        def run():
+            try:
+                self.refresh(norad_id)
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(norad_id)
+
+        thread = threading.Thread(target=run, name=f"tle-refresh-{norad_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def get(self, norad_id):
+        """
+        Return TLE lines for `norad_id`, touching the network only when needed.
+
+        Fresh entries are returned directly. Stale but usable entries are
+        returned immediately and refreshed in the background. Missing or
+        outdated entries are refreshed synchronously; if that fails the old
+        entry (if any) is still returned. Returns None when nothing is available.
+        """
+        entry = self.lookup(norad_id)
+        if entry is not None and self.is_usable(entry):
+            if not self.is_fresh(entry):
+                self.refresh_in_background(norad_id)
+            return entry.lines
+
+        refreshed = self.refresh(norad_id)
+        if refreshed is not None:
+            return refreshed.lines
+        return entry.lines if entry is not None else None
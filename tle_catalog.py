@@ -0,0 +1,137 @@
+"""
+ISS Pass Predictor - multi-satellite TLE catalog.
+Parses a full 3-line TLE file (such as Celestrak's stations.txt) once into an
+indexed element set keyed by NORAD ID and by name. EarthSatellite objects are
+only built when a satellite is first looked up.
+"""
+
+import numpy as np
+import requests
+
+from tle_cache import tle_epoch, tle_norad_id
+
+STATIONS_URL = "https://celestrak.org/NORAD/elements/stations.txt"
+
+
+def tle_checksum(line):
+    """Modulo-10 checksum of a TLE line: digits count their value, '-' counts 1."""
+    total = 0
+    for char in line[:68]:
+        if char.isdigit():
+            total += int(char)
+        elif char == '-':
+            total += 1
+    return total % 10
+
+
+def tle_line_valid(line, line_number):
+    """True if `line` is a well-formed TLE line `line_number` (1 or 2) with a good checksum."""
+    return (len(line) >= 69 and line[0] == str(line_number) and line[68].isdigit()
+            and tle_checksum(line) == int(line[68]))
+
+
+class TLECatalog:
+    """
+    Indexed set of TLEs.
+
+    Records are kept in parallel arrays (names, line 1, line 2, NORAD IDs).
+    Lookups by NORAD ID or by name go through dictionaries, so finding one
+    object never rescans the file.
+    """
+
+    def __init__(self, names, line1s, line2s, rejected=0):
+        self.names = list(names)
+        self.line1s = list(line1s)
+        self.line2s = list(line2s)
+        self.norad_ids = np.array([tle_norad_id(line) for line in self.line1s], dtype=np.int32)
+        # Number of records dropped for bad format or checksum
+        self.rejected = rejected
+
+        self._by_norad = {}
+        self._by_name = {}
+        for index, (norad_id, name) in enumerate(zip(self.norad_ids.tolist(), self.names)):
+            # Keep the first record when a file lists an object twice
+            self._by_norad.setdefault(norad_id, index)
+            self._by_name.setdefault(name.upper(), index)
+        self._satellites = {}
+
+    @classmethod
+    def from_lines(cls, lines, validate=True):
+        """Build a catalog from TLE file lines (3-line format; name lines optional)."""
+        lines = [line.rstrip() for line in lines if line.strip()]
+        names, line1s, line2s = [], [], []
+        rejected = 0
+        i = 0
+        while i < len(lines):
+            if lines[i].startswith('1 ') and i + 1 < len(lines) and lines[i + 1].startswith('2 '):
+                name, line1, line2 = None, lines[i], lines[i + 1]
+                i += 2
+            elif i + 2 < len(lines) and lines[i + 1].startswith('1 ') and lines[i + 2].startswith('2 '):
+                name, line1, line2 = lines[i].strip(), lines[i + 1], lines[i + 2]
+                i += 3
+            else:
+                i += 1
+                continue
+
+            if validate and not (tle_line_valid(line1, 1) and tle_line_valid(line2, 2)
+                                 and line1[2:7] == line2[2:7]):
+                rejected += 1
+                continue
+            names.append(name or f"NORAD {tle_norad_id(line1)}")
+            line1s.append(line1)
+            line2s.append(line2)
+        return cls(names, line1s, line2s, rejected=rejected)
+
+    @classmethod
+    def from_text(cls, text, validate=True):
+        """Build a catalog from the contents of a TLE file."""
+        return cls.from_lines(text.splitlines(), validate=validate)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, key):
+        return self._index(key) is not None
+
+    def _index(self, key):
+        if isinstance(key, (int, np.integer)) or (isinstance(key, str) and key.strip().isdigit()):
+            return self._by_norad.get(int(key))
+        return self._by_name.get(str(key).strip().upper())
+
+    def index_of(self, key):
+        """Return the record index for a NORAD ID or name; raises KeyError if absent."""
+        index = self._index(key)
+        if index is None:
+            raise KeyError(f"Satellite {key!r} is not in the catalog")
+        return index
+
+    def lines(self, key):
+        """Return [name, line 1, line 2] for a NORAD ID or name."""
+        index = self.index_of(key)
+        return [self.names[index], self.line1s[index], self.line2s[index]]
+
+    def epoch(self, key):
+        """Return the TLE epoch of a satellite as a UTC datetime."""
+        return tle_epoch(self.line1s[self.index_of(key)])
+
+    def satellite(self, key, ts):
+        """Return the EarthSatellite for a NORAD ID or name, building it on first use."""
+        index = self.index_of(key)
+        satellite = self._satellites.get(index)
+        if satellite is None:
+            from skyfield.api import EarthSatellite
+
+            satellite = EarthSatellite(self.line1s[index], self.line2s[index], self.names[index], ts)
+            self._satellites[index] = satellite
+        return satellite
+
+    def satellites(self, keys, ts):
+        """Return {name: EarthSatellite} for several NORAD IDs or names."""
+        return {self.names[self.index_of(key)]: self.satellite(key, ts) for key in keys}
+
+
+def download_tle_catalog(url=STATIONS_URL, timeout=20):
+    """Download a multi-satellite TLE file and return it as a TLECatalog."""
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    return TLECatalog.from_text(response.text)
@@ -0,0 +1,199 @@
+"""
+ISS Pass Predictor - concurrent TLE fetching.
+Fetches TLE sets with asyncio over one pooled HTTP session. For every object
+the single-object GP query (primary) and the stations file (secondary) are
+requested at the same time, and the first response that parses into a valid
+TLE set wins, so a slow or failing source no longer adds its retries to the
+latency of the other. Many catalog numbers can be fetched at once behind a
+concurrency limit; the stations file is downloaded once and shared.
+
+Requests run on a small thread pool through a requests.Session with a
+matching connection pool, so no async HTTP client is needed.
+"""
+
+import asyncio
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RequestException
+
+from tle_cache import CELESTRAK_GP_URL
+from tle_catalog import STATIONS_URL, TLECatalog
+
+DEFAULT_MAX_CONCURRENCY = 8
+# Attempts per source; retries back off exponentially from DEFAULT_RETRY_DELAY
+DEFAULT_PRIMARY_ATTEMPTS = 3
+DEFAULT_SECONDARY_ATTEMPTS = 2
+DEFAULT_RETRY_DELAY = 3.0
+
+# lines: name line and the two TLE lines; source: 'primary' or 'secondary';
+# seconds: time until this result was available; etag, last_modified: the
+# primary response's validators, for TLECache.store() (None for the secondary)
+TLEFetchResult = namedtuple('TLEFetchResult', ['norad_id', 'lines', 'source', 'seconds', 'etag', 'last_modified'],
+                            defaults=(None, None))
+
+
+def _ignore(level, message):
+    pass
+
+
+class AsyncTLEFetcher:
+    """
+    Hedged, concurrent TLE downloads.
+
+    `gp_url` is formatted with `norad_id`; both URLs can point at local
+    servers. `hedge_delay` holds the secondary request back for that many
+    seconds (0 sends both at once). `notify(level, message)` receives retry
+    warnings, as in iss_pipeline.download_tle_data(). Use as an async context
+    manager, or call close() when done.
+    """
+
+    def __init__(self, gp_url=CELESTRAK_GP_URL, stations_url=STATIONS_URL, timeout=20,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, primary_attempts=DEFAULT_PRIMARY_ATTEMPTS,
+                 secondary_attempts=DEFAULT_SECONDARY_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY,
+                 hedge_delay=0.0, notify=None):
+        self.gp_url = gp_url
+        self.stations_url = stations_url
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.primary_attempts = primary_attempts
+        self.secondary_attempts = secondary_attempts
+        self.retry_delay = retry_delay
+        self.hedge_delay = hedge_delay
+        self.notify = notify or _ignore
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='tle-fetch')
+        self._semaphore = None
+        self._catalog_task = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    async def _get(self, url):
+        # Created lazily so the semaphore belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            response = await loop.run_in_executor(
+                self._executor, lambda: self.session.get(url, timeout=self.timeout))
+        response.raise_for_status()
+        return response
+
+    async def _get_with_retries(self, url, url_name, attempts):
+        """The response, or None after `attempts` failed requests."""
+        for attempt in range(attempts):
+            try:
+                return await self._get(url)
+            except RequestException:
+                if attempt < attempts - 1:
+                    delay = self.retry_delay * (2 ** attempt)
+                    self.notify('warning', f"Download failed from {url_name} (Attempt {attempt + 1}/{attempts}). "
+                                           f"Retrying in {delay:g} seconds...")
+                    await asyncio.sleep(delay)
+        self.notify('error', f"Failed to download TLE data from {url_name} after {attempts} attempts.")
+        return None
+
+    async def fetch_primary(self, norad_id):
+        """
+        (TLE lines, validators) for `norad_id` from the GP query, or None.
+
+        validators holds the response's ETag and Last-Modified headers, so the
+        cache can revalidate the entry with a conditional request later.
+        """
+        response = await self._get_with_retries(self.gp_url.format(norad_id=norad_id),
+                                                f"Primary (CATNR={norad_id})", self.primary_attempts)
+        if response is None:
+            return None
+        catalog = TLECatalog.from_text(response.text)
+        if norad_id not in catalog:
+            return None
+        validators = {'etag': response.headers.get('ETag'),
+                      'last_modified': response.headers.get('Last-Modified')}
+        return catalog.lines(norad_id), validators
+
+    async def _download_catalog(self):
+        response = await self._get_with_retries(self.stations_url, "Secondary (stations.txt)",
+                                                self.secondary_attempts)
+        return TLECatalog.from_text(response.text) if response is not None else None
+
+    async def fetch_catalog(self):
+        """The parsed stations file, downloaded once per fetcher (None if it failed)."""
+        if self._catalog_task is None:
+            self._catalog_task = asyncio.ensure_future(self._download_catalog())
+        # shield: one caller being cancelled must not cancel the shared download
+        return await asyncio.shield(self._catalog_task)
+
+    async def fetch_secondary(self, norad_id):
+        """
+        (TLE lines, validators) for `norad_id` from the stations file, or None.
+
+        validators is empty: the stations file's headers do not describe the
+        single-object query the cache revalidates against.
+        """
+        if self.hedge_delay:
+            await asyncio.sleep(self.hedge_delay)
+        catalog = await self.fetch_catalog()
+        if catalog is None or norad_id not in catalog:
+            return None
+        return catalog.lines(norad_id), {}
+
+    async def fetch(self, norad_id):
+        """
+        Hedged fetch of one object: the first valid TLE set from either source.
+
+        Returns a TLEFetchResult, or None when neither source has the object.
+        """
+        norad_id = int(norad_id)
+        started = time.perf_counter()
+        tasks = {
+            asyncio.ensure_future(self.fetch_primary(norad_id)): 'primary',
+            asyncio.ensure_future(self.fetch_secondary(norad_id)): 'secondary',
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result():
+                        lines, validators = task.result()
+                        return TLEFetchResult(norad_id, lines, tasks[task], time.perf_counter() - started,
+                                              **validators)
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_many(self, norad_ids):
+        """{norad_id: TLEFetchResult or None} for several objects, fetched concurrently."""
+        norad_ids = [int(norad_id) for norad_id in norad_ids]
+        results = await asyncio.gather(*(self.fetch(norad_id) for norad_id in norad_ids))
+        return dict(zip(norad_ids, results))
+
+
+def fetch_tle_sets(norad_ids, **kwargs):
+    """
+    Blocking wrapper around AsyncTLEFetcher.fetch_many().
+
+    Keyword arguments are passed to AsyncTLEFetcher. Must not be called from
+    a running event loop.
+    """
+    async def run():
+        async with AsyncTLEFetcher(**kwargs) as fetcher:
+            return await fetcher.fetch_many(norad_ids)
+
+    return asyncio.run(run())